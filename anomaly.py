@@ -0,0 +1,198 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+from instrument import timed
+
+# 튐(spike): 직전 WINDOW 행의 중앙값에서 벗어난 정도를 이동 MAD 로 나눈 값이 Z_THRESHOLD 를 넘는 점
+WINDOW = 24
+Z_THRESHOLD = 6.0
+MIN_SCALE = 0.01        # 측정 분해능 (m). 값이 거의 일정한 구간에서 MAD 가 0 이 되는 것을 막음
+# 계단 변화(step): 앞뒤 STEP_ROWS 행 중앙값의 차이가 STEP_MIN (m) 이상이고,
+# 직전 STEP_NOISE_ROWS 행 동안의 그 차이의 MAD 의 STEP_Z 배 이상 (평소 오르내림이 큰 관측정은 기준이 높아짐)
+STEP_ROWS = 6
+STEP_MIN = 0.2
+STEP_NOISE_ROWS = 168   # 일주일
+STEP_Z = 6.0
+# 고착(stuck): 같은 값이 STUCK_ROWS 행 이상 이어짐
+STUCK_ROWS = 24
+# 결측(gap): 시간 간격이 GAP_HOURS 를 넘거나, 한 관측정 값이 MISSING_ROWS 행 이상 비어 있음
+GAP_HOURS = 3
+MISSING_ROWS = 6
+
+# 다음 조각을 처리할 때 앞쪽 맥락으로 남겨 둘 행 수
+CONTEXT_ROWS = max(2 * WINDOW, STEP_NOISE_ROWS) + 2 * STEP_ROWS
+
+EVENT_COLUMNS = ['Time', 'end', 'well', 'kind', 'value', 'score']
+
+
+# 연속 구간의 길이: runs[t] = t 에서 끝나는 (mask 가 참인) 구간의 길이, carry 는 직전 조각에서 이어진 길이
+def _run_lengths(mask, carry):
+    n = mask.shape[0]
+    rows = np.arange(1, n + 1)[:, None]
+    resets = np.where(mask, 0, rows)
+    last_reset = np.maximum.accumulate(resets, axis=0)
+    runs = rows - last_reset
+    # 조각 처음부터 이어진 구간은 직전 조각의 길이를 더함
+    return np.where(last_reset == 0, runs + carry, runs)
+
+
+# 사이트 하나의 관측정 전체에 대한 점검 상태
+# update 는 새로 들어온 행만 (앞쪽 맥락 행과 함께) 처리하고, 관측정별 상태를 다음 조각으로 넘김
+class Detector:
+    def __init__(self, wells, lineage=None):
+        self.wells = np.asarray(wells, dtype=object)
+        self.lineage = lineage                       # 점검한 자료의 계보 (data_loader.data_lineage)
+        m = len(self.wells)
+        self.last_time = None                        # 마지막으로 처리한 Time
+        self.context_times = np.array([], dtype="datetime64[ns]")
+        self.context = np.empty((0, m))              # 앞쪽 맥락 (행, 관측정)
+        self.pending_spikes = 0                      # 다음 행이 없어 아직 튐을 판정하지 못한 행 수
+        self.pending_steps = 0                       # 뒤쪽 행이 모자라 아직 계단 변화를 판정하지 못한 행 수
+        self.stuck_run = np.zeros(m, dtype=np.int64)
+        self.missing_run = np.zeros(m, dtype=np.int64)
+        self.missing_start = np.full(m, np.datetime64("NaT"), dtype="datetime64[ns]")
+        self.events = pd.DataFrame(columns=EVENT_COLUMNS)
+
+    def update(self, times, block):
+        if len(times) == 0:
+            return self.events.iloc[:0]
+        n_ctx = len(self.context_times)
+        times = np.concatenate([self.context_times, times])
+        values = np.vstack([self.context, np.asarray(block, dtype=np.float64)])
+
+        found = [f for f in (self._spikes(times, values, n_ctx),
+                             self._steps(times, values, n_ctx),
+                             self._stuck(times, values, n_ctx),
+                             self._missing(times, values, n_ctx),
+                             self._time_gaps(times, n_ctx)) if len(f)]
+        found = pd.concat(found, ignore_index=True).sort_values('Time', kind='mergesort') if found else self.events.iloc[:0]
+        self.events = pd.concat([self.events, found], ignore_index=True) if len(self.events) else found.reset_index(drop=True)
+
+        self.last_time = times[-1]
+        # 복사해 두어야 이번 조각 전체 배열이 메모리에 남지 않음
+        self.context_times = times[-CONTEXT_ROWS:].copy()
+        self.context = values[-CONTEXT_ROWS:].copy()
+        return found
+
+    def _frame(self, times, rows, cols, kind, values, scores, starts=None):
+        return pd.DataFrame({
+            'Time': times[rows] if starts is None else starts,
+            'end': times[rows],
+            'well': self.wells[cols],
+            'kind': kind,
+            'value': values,
+            'score': scores,
+        })
+
+    # 직전 WINDOW 행 중앙값 대비 벗어난 정도 (이동 MAD 로 정규화)
+    # 다음 행이 다시 기준선 쪽으로 돌아온 점만 튐으로 봄 (계속 벗어나 있으면 계단 변화)
+    def _spikes(self, times, values, n_ctx):
+        frame = pd.DataFrame(values)
+        median = frame.rolling(WINDOW, min_periods=WINDOW // 2).median().shift(1).to_numpy()
+        resid = np.abs(values - median)
+        scale = 1.4826 * pd.DataFrame(resid).rolling(WINDOW, min_periods=WINDOW // 2).median().shift(1).to_numpy()
+        z = np.nan_to_num(resid / np.maximum(scale, MIN_SCALE))
+        first = n_ctx - self.pending_spikes
+        last = len(times) - 1
+        self.pending_spikes = len(times) - max(first, last)
+        back = np.abs(values[1:] - median[:-1]) < resid[:-1] / 2
+        rows, cols = np.nonzero((z[first:last] > Z_THRESHOLD) & back[first:last])
+        rows += first
+        return self._frame(times, rows, cols, "spike", values[rows, cols], z[rows, cols])
+
+    # 앞 STEP_ROWS 행과 뒤 STEP_ROWS 행의 중앙값 차이가 기준 이상이고 그 차이가 가장 큰 행
+    # 뒤쪽 행이 다 들어와야 판정할 수 있으므로 아직 판정하지 못한 행은 다음 조각에서 처리
+    def _steps(self, times, values, n_ctx):
+        frame = pd.DataFrame(values)
+        before = frame.rolling(STEP_ROWS, min_periods=1).median().shift(1)
+        after = frame[::-1].rolling(STEP_ROWS, min_periods=STEP_ROWS).median()[::-1]
+        jump = (after - before).to_numpy()
+        noise = 1.4826 * pd.DataFrame(np.abs(jump)).rolling(STEP_NOISE_ROWS, min_periods=WINDOW).median().shift(1).to_numpy()
+        threshold = np.maximum(STEP_MIN, STEP_Z * np.nan_to_num(noise))
+        jump = np.nan_to_num(jump)
+        size = np.abs(jump)
+        first = n_ctx - self.pending_steps
+        last = len(times) - STEP_ROWS      # 다음 행의 차이까지 알 수 있는 마지막 행 (포함하지 않음)
+        self.pending_steps = len(times) - max(first, last)
+        if last <= first:
+            return self.events.iloc[:0]
+        prev = np.vstack([np.zeros((1, size.shape[1])), size[:-1]])
+        peak = (size >= threshold) & (size >= prev)
+        peak[:-1] &= size[:-1] > size[1:]
+        rows, cols = np.nonzero(peak[first:last])
+        rows += first
+        return self._frame(times, rows, cols, "step", values[rows, cols], jump[rows, cols])
+
+    # 같은 값이 STUCK_ROWS 개째 이어지는 행에서 한 번만 표시 (시작 시간 ~ 그 행)
+    def _stuck(self, times, values, n_ctx):
+        block = values[n_ctx:]
+        prev = values[n_ctx - 1:n_ctx] if n_ctx else np.full((1, block.shape[1]), np.nan)
+        runs = _run_lengths(block == np.vstack([prev, block[:-1]]), self.stuck_run)
+        self.stuck_run = runs[-1].copy()
+        rows, cols = np.nonzero(runs == STUCK_ROWS - 1)
+        rows += n_ctx
+        starts = times[rows - (STUCK_ROWS - 1)]
+        return self._frame(times, rows, cols, "stuck", values[rows, cols],
+                           np.full(len(rows), float(STUCK_ROWS)), starts)
+
+    # 한 관측정 값이 MISSING_ROWS 행 이상 비었다가 다시 들어오면 그 구간을 표시
+    def _missing(self, times, values, n_ctx):
+        missing = np.isnan(values[n_ctx:])
+        runs = _run_lengths(missing, self.missing_run)
+        prev_runs = np.vstack([self.missing_run[None, :], runs[:-1]])
+        rows, cols = np.nonzero(~missing & (prev_runs >= MISSING_ROWS))
+        lengths = prev_runs[rows, cols]
+        rows += n_ctx
+        # 구간이 맥락보다 앞에서 시작했으면 기억해 둔 시작 시간을 씀
+        start_rows = rows - lengths
+        starts = np.where(start_rows >= 0, times[np.maximum(start_rows, 0)], self.missing_start[cols])
+        found = self._frame(times, rows - 1, cols, "gap", np.nan, lengths.astype(np.float64), starts)
+
+        # 조각 끝까지 이어지는 결측 구간의 시작 시간
+        open_rows = len(times) - runs[-1]
+        self.missing_start = np.where(runs[-1] == 0, np.datetime64("NaT"),
+                                      np.where(open_rows >= 0, times[np.clip(open_rows, 0, len(times) - 1)], self.missing_start))
+        self.missing_run = runs[-1].copy()
+        return found
+
+    # 사이트 전체의 시간 간격이 GAP_HOURS 를 넘는 곳 (well='*')
+    def _time_gaps(self, times, n_ctx):
+        hours = np.diff(times) / np.timedelta64(1, "h")
+        rows = np.flatnonzero(hours[max(n_ctx - 1, 0):] > GAP_HOURS) + max(n_ctx - 1, 0)
+        return pd.DataFrame({'Time': times[rows], 'end': times[rows + 1], 'well': "*", 'kind': "gap",
+                             'value': np.nan, 'score': hours[rows]})
+
+
+_detectors = {}
+_lock = threading.Lock()
+
+
+# 사이트 자료 중 아직 점검하지 않은 행만 점검하고, 이번에 새로 찾은 항목을 반환
+# 자료를 처음부터 다시 읽었으면 (원본이 고쳐졌거나 저장소를 다시 만듦) 점검도 처음부터 다시 함
+@timed("anomaly")
+def update(name):
+    with _lock:
+        wells, _, _ = data_loader.describe(name)
+        lineage = data_loader.data_lineage(name)
+        detector = _detectors.get(name)
+        if detector is None or detector.lineage != lineage or list(detector.wells) != list(wells):
+            detector = _detectors[name] = Detector(wells, lineage)
+        start = None if detector.last_time is None else detector.last_time + np.timedelta64(1, "ns")
+        times, block = data_loader.load_block(name, wells, start=start)
+        return detector.update(times, block)
+
+
+# 점검 결과 (필요하면 관측정/기간으로 거름). 사이트 전체 결측(well='*')은 모든 관측정에 포함
+def events(name, well=None, start=None, end=None):
+    update(name)
+    found = _detectors[name].events
+    if well is not None:
+        found = found[(found['well'] == well) | (found['well'] == "*")]
+    if start is not None:
+        found = found[found['end'] >= pd.Timestamp(start)]
+    if end is not None:
+        found = found[found['Time'] <= pd.Timestamp(end)]
+    return found
@@ -0,0 +1,287 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import sys
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pyarrow as pa
+from pandas.errors import OutOfBoundsDatetime
+
+import data_loader
+import instrument
+import warmup
+from downsample import downsample, point_budget
+from export import FORMATS, cached_bytes, iter_export
+from resample import STEPS, pick_freq
+from sites import get_site, site_names
+
+# 화면 없이 스크립트/다른 도구에서 관측 자료를 받는 HTTP API
+#   GET /metrics                                단계별 누적 시간 (GW_TRACE 등으로 측정을 켰을 때, Prometheus 형식)
+#   GET /sites                                  사이트 목록
+#   GET /sites/{site}/wells                     관측정 목록과 자료 기간
+#   GET /sites/{site}/wells/{well}?start=&end=&resolution=&points=&format=
+#   GET /sites/{site}/export?wells=&start=&end=&format=   원자료 파일 (csv, csv.gz, parquet)
+# start/end: 시간대가 없으면 자료의 현지 시각, 있으면 (Z, +09:00 등) 사이트 시간대로 바꿔서 씀
+# resolution: raw(원자료, 기본), h/D(1시간/1일 격자), auto(기간에 맞는 격자)
+# points: raw 자료를 최소/최대 보존 방식으로 이 개수 안팎까지 줄임 (0 이면 그대로)
+# format: json(기본) 또는 arrow (Accept: application/vnd.apache.arrow.stream 도 가능)
+# export: wells 는 쉼표로 구분 (없으면 전체). 파일을 조각마다 바로 보내므로 전체 자료도 메모리에 모으지 않음
+#
+# ASGI 서버로 실행:  uvicorn api:app
+# 추가 패키지 없이:  python api.py [포트]
+
+ARROW_MIME = "application/vnd.apache.arrow.stream"
+JSON_HEADERS = [("content-type", "application/json; charset=utf-8")]
+RESOLUTIONS = ["raw", "auto", *STEPS]
+DEFAULT_PORT = 8600
+
+logger = logging.getLogger(__name__)
+# 이보다 작은 응답은 압축하지 않음
+GZIP_MIN_BYTES = 1024
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _json_bytes(obj):
+    return json.dumps(obj, ensure_ascii=False, default=str).encode()
+
+
+def _find_site(name):
+    if name not in site_names():
+        raise ApiError(404, f"없는 사이트입니다: {name}")
+    return get_site(name)
+
+
+# 시간대가 붙은 시각(2024-05-01T00:00Z 등)은 자료의 시간대(tz)로 바꾼 뒤 시간대를 뗌
+# 자료의 시각은 시간대 없는 현지 시각이므로 그대로 비교하면 그만큼 기간이 어긋남
+# NaT 나 datetime64[ns] 로 나타낼 수 없는 시각 (1677~2262년 밖)은 400
+def _time_param(params, name, tz):
+    text = params.get(name)
+    if not text:
+        return None
+    try:
+        value = pd.Timestamp(text)
+        if not pd.isna(value) and value.tzinfo is not None:
+            value = value.tz_convert(tz).tz_localize(None)
+    except (ValueError, OutOfBoundsDatetime, OverflowError):
+        raise ApiError(400, f"{name} 시간 형식을 읽을 수 없습니다: {text}")
+    if pd.isna(value):
+        raise ApiError(400, f"{name} 에 시각이 없습니다: {text}")
+    if not pd.Timestamp.min <= value <= pd.Timestamp.max:
+        raise ApiError(400, f"{name} 값이 지원하는 기간 (1677~2262년) 밖입니다: {text}")
+    return value.as_unit("ns")
+
+
+def _well_params(params, tz):
+    start, end = _time_param(params, "start", tz), _time_param(params, "end", tz)
+    resolution = params.get("resolution", "raw")
+    if resolution not in RESOLUTIONS:
+        raise ApiError(400, f"resolution 은 {', '.join(RESOLUTIONS)} 중 하나여야 합니다.")
+    try:
+        points = int(params.get("points", 0))
+    except ValueError:
+        raise ApiError(400, "points 는 정수여야 합니다.")
+    return start, end, resolution, max(points, 0)
+
+
+# 관측정 자료 (화면과 같은 로더/색인/격자/점 줄이기 사용)
+def _well_frame(csv_name, well, start, end, resolution, points, bounds):
+    if resolution == "auto":
+        resolution = pick_freq(start or bounds[0], end or bounds[1], points or point_budget())
+    if resolution == "raw":
+        df = data_loader.load_csv(csv_name, [well], start, end)
+        return resolution, (downsample(df, well, points) if points else df)
+    frame = data_loader.regular(csv_name, well, resolution, start, end)
+    return resolution, frame.rename(columns={"mean": well})
+
+
+def _encode(meta, frame, fmt):
+    if fmt == "arrow":
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        table = table.replace_schema_metadata({k.encode(): str(v).encode() for k, v in meta.items()})
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+    # {"columns": [...], "data": [[...], ...]} 는 pandas 가 바로 만들고 앞에 meta 만 붙임
+    table = frame.to_json(orient="split", index=False, date_format="iso", date_unit="s")
+    return (json.dumps(meta, ensure_ascii=False, default=str)[:-1] + ", " + table[1:]).encode()
+
+
+def _sites():
+    return 200, JSON_HEADERS, _json_bytes({"sites": site_names()})
+
+
+def _wells(site_name):
+    site = _find_site(site_name)
+    wells, first, last = data_loader.describe(site["csv"])
+    return 200, JSON_HEADERS, _json_bytes({"site": site_name, "wells": list(wells), "start": first, "end": last,
+                                           "dropped_rows": data_loader.dropped_rows(site["csv"])})
+
+
+# (상태, 헤더, 본문). 같은 조건과 자료 버전의 응답 본문은 캐시해서 재사용하고, ETag 로 변경 여부를 알려 줌
+def _well(site_name, well, params, headers):
+    site = _find_site(site_name)
+    csv_name = site["csv"]
+    wells, first, last = data_loader.describe(csv_name)
+    if well not in wells:
+        raise ApiError(404, f"없는 관측정입니다: {well}")
+    start, end, resolution, points = _well_params(params, site["tz"])
+    fmt = params.get("format") or ("arrow" if ARROW_MIME in headers.get("accept", "") else "json")
+    if fmt not in ("json", "arrow"):
+        raise ApiError(400, "format 은 json 또는 arrow 여야 합니다.")
+
+    key = ("api", csv_name, well, start, end, resolution, points, data_loader.data_version(csv_name))
+    etag = '"' + hashlib.sha1(repr((key, fmt)).encode()).hexdigest()[:20] + '"'
+    response_headers = [("etag", etag), ("cache-control", "no-cache"), ("vary", "Accept, Accept-Encoding")]
+    if etag in headers.get("if-none-match", ""):
+        return 304, response_headers, b""
+
+    def make():
+        used, frame = _well_frame(csv_name, well, start, end, resolution, points, (first, last))
+        meta = {"site": site_name, "well": well, "resolution": used, "rows": len(frame)}
+        with instrument.stage(f"api_{fmt}", rows=len(frame)) as s:
+            body = _encode(meta, frame, fmt)
+            s.add(nbytes=len(body))
+        return body
+
+    body = cached_bytes(key, fmt, make)
+    response_headers += [("content-type", ARROW_MIME)] if fmt == "arrow" else JSON_HEADERS
+    if "gzip" in headers.get("accept-encoding", "") and len(body) >= GZIP_MIN_BYTES:
+        body = cached_bytes(key, fmt + ".gz", lambda: gzip.compress(body, 6))
+        response_headers.append(("content-encoding", "gzip"))
+    return 200, response_headers, body
+
+
+# 원자료 파일. 본문은 bytes 조각을 내는 iterator (export.iter_export)
+def _export(site_name, params):
+    site = _find_site(site_name)
+    csv_name = site["csv"]
+    wells, _, _ = data_loader.describe(csv_name)
+    columns = [w for w in params.get("wells", "").split(",") if w] or list(wells)
+    unknown = [w for w in columns if w not in wells]
+    if unknown:
+        raise ApiError(404, f"없는 관측정입니다: {', '.join(unknown)}")
+    fmt = params.get("format", "csv")
+    if fmt not in FORMATS:
+        raise ApiError(400, f"format 은 {', '.join(FORMATS)} 중 하나여야 합니다.")
+    start, end = _time_param(params, "start", site["tz"]), _time_param(params, "end", site["tz"])
+
+    df = data_loader.load_csv(csv_name, columns, start, end)
+    mime, ext = FORMATS[fmt]
+    disposition = "attachment; filename*=UTF-8''" + urllib.parse.quote(site_name + ext)
+    return 200, [("content-type", mime), ("content-disposition", disposition)], iter_export(df, fmt, site["time_format"])
+
+
+# 요청 하나를 처리해서 (상태, 헤더, 본문) 반환 (ASGI 와 표준 라이브러리 서버가 함께 씀). headers 의 이름은 소문자
+# 본문은 bytes, 내보내기 파일은 bytes 조각을 내는 iterator
+def handle(method, path, query, headers):
+    try:
+        if method not in ("GET", "HEAD"):
+            raise ApiError(405, "GET 요청만 지원합니다.")
+        parts = [urllib.parse.unquote(p) for p in path.strip("/").split("/")]
+        if parts == ["metrics"]:
+            return 200, [("content-type", "text/plain; version=0.0.4")], instrument.metrics_text().encode()
+        if parts == ["sites"]:
+            return _sites()
+        if len(parts) == 3 and parts[0] == "sites" and parts[2] == "wells":
+            return _wells(parts[1])
+        if len(parts) == 3 and parts[0] == "sites" and parts[2] == "export":
+            return _export(parts[1], dict(urllib.parse.parse_qsl(query)))
+        if len(parts) == 4 and parts[0] == "sites" and parts[2] == "wells":
+            return _well(parts[1], parts[3], dict(urllib.parse.parse_qsl(query)), headers)
+        raise ApiError(404, "없는 주소입니다.")
+    except ApiError as e:
+        return e.status, JSON_HEADERS, _json_bytes({"error": e.message})
+    except Exception as e:
+        # 예상하지 못한 오류도 JSON 으로 알려 주고, 자세한 내용은 서버 로그에 남김
+        logger.exception("%s %s 처리 중 오류", method, path)
+        return 500, JSON_HEADERS, _json_bytes({"error": f"서버 오류: {type(e).__name__}"})
+
+
+# ASGI 앱
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # 첫 요청이 자료 읽기를 기다리지 않도록 서버 시작 때 캐시를 채움
+                warmup.prewarm_in_background()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+    headers = {k.decode("latin-1").lower(): v.decode("latin-1") for k, v in scope["headers"]}
+    query = scope.get("query_string", b"").decode("latin-1")
+    # 자료 읽기는 블로킹이므로 스레드에서 처리
+    status, response_headers, body = await asyncio.to_thread(handle, scope["method"], scope["path"], query, headers)
+    if isinstance(body, bytes):
+        response_headers = response_headers + [("content-length", str(len(body)))]
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(k.encode(), v.encode()) for k, v in response_headers]})
+    if scope["method"] == "HEAD" or isinstance(body, bytes):
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+        return
+    # 내보내기 파일은 조각을 만드는 대로 보냄 (조각 만들기도 블로킹이므로 스레드에서)
+    while True:
+        chunk = await asyncio.to_thread(next, body, None)
+        if chunk is None:
+            break
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+# 표준 라이브러리 HTTP 서버용 처리기 (로컬 확인용)
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self):
+        path, _, query = self.path.partition("?")
+        headers = {k.lower(): v for k, v in self.headers.items()}
+        status, response_headers, body = handle(self.command, path, query, headers)
+        self.send_response(status)
+        for name, value in response_headers:
+            self.send_header(name, value)
+        if isinstance(body, bytes):
+            self.send_header("content-length", str(len(body)))
+        else:
+            self.send_header("transfer-encoding", "chunked")
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+        if isinstance(body, bytes):
+            self.wfile.write(body)
+            return
+        # 내보내기 파일은 chunked 로 조각마다 보냄
+        for chunk in body:
+            if chunk:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+        self.wfile.write(b"0\r\n\r\n")
+
+    do_GET = do_HEAD = do_POST = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=DEFAULT_PORT, host="127.0.0.1"):
+    warmup.prewarm_in_background()
+    server = ThreadingHTTPServer((host, port), Handler)
+    logger.info("http://%s:%d/sites", host, port)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    serve(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT)
@@ -0,0 +1,278 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime, timedelta
+import anomaly
+import instrument
+from data_loader import load_csv, load_block, describe, data_version, dropped_rows, range_stats, regular, rollup
+from export import FORMATS, download_button
+from downsample import CHART_WIDTH_PX, downsample, point_budget
+from multi_view import block_frame, grid_figure, overlay_figure
+from resample import INTERPOLATE_LIMIT, STEP_LABELS, pick_freq
+from sites import get_site, site_names
+from stats_cache import ROLLUPS, summarize
+import refresher
+
+
+VIEW_MODES = ["한 위치", "여러 위치 겹쳐 보기", "여러 위치 나눠 보기"]
+
+# 이상 자료 종류 -> (범례 이름, 표시 모양)
+ANOMALY_MARKERS = [("spike", "튐", "x"), ("step", "계단 변화", "triangle-up"), ("stuck", "고착", "square")]
+MAX_GAP_SHAPES = 100
+
+
+# 그래프에 이상 자료를 겹쳐 그림 (결측 구간 음영은 최대 MAX_GAP_SHAPES 개)
+def add_anomalies(fig, events):
+    for kind, label, symbol in ANOMALY_MARKERS:
+        found = events[events['kind'] == kind]
+        if len(found):
+            fig.add_scatter(x=found['Time'], y=found['value'], mode="markers", name=label,
+                            marker=dict(symbol=symbol, size=9, color="red"))
+    for _, gap in events[events['kind'] == "gap"].tail(MAX_GAP_SHAPES).iterrows():
+        fig.add_vrect(x0=gap['Time'], x1=gap['end'], fillcolor="gray", opacity=0.2, line_width=0)
+
+
+# 사이트의 그래프 폭 (px). 점 줄이기와 격자 간격을 이 폭에 맞춤
+def chart_width(site):
+    return site["chart_width"] or CHART_WIDTH_PX
+
+
+# 여러 위치를 그래프 하나(WebGL)로 표시
+# 선택한 위치 전체를 한 번의 기간 조회로 (행, 위치) 배열로 꺼내고, 점 줄이기도 한 번에 처리
+def show_wells(site, locations, view_mode, start_datetime, end_datetime, selected_hour):
+    csv_name = site["csv"]
+    if not locations:
+        st.warning("위치를 하나 이상 선택해 주세요.")
+        return
+
+    times, block = load_block(csv_name, locations, start_datetime, end_datetime,
+                              hour=None if selected_hour == 24 else selected_hour)
+    if len(times) == 0:
+        st.warning("선택된 기간에 해당하는 데이터가 없습니다.")
+        return
+
+    # Main content (오른쪽 프레임)
+    st.title("지하수위 관측 웹페이지")
+    if site["image"]:
+        st.image(site["image"], use_column_width=True)
+
+    start_str = start_datetime.strftime('%y년 %m월 %d일 %H시')
+    end_str = end_datetime.strftime('%y년 %m월 %d일 %H시')
+    title = f"{len(locations)}개 위치의 지하수위 그래프 ({start_str}부터 {end_str})"
+    st.subheader(title)
+
+    if view_mode == VIEW_MODES[1]:
+        fig = overlay_figure(times, block, locations, title, max_points=point_budget(chart_width(site)))
+    else:
+        fig = grid_figure(times, block, locations, title, width_px=chart_width(site))
+    with instrument.stage("chart_send"):
+        st.plotly_chart(fig, use_container_width=True)
+
+    # 선택한 위치들의 자료 다운로드 (버튼을 누를 때만 파일을 만듦)
+    export_format = st.radio("다운로드 형식", list(FORMATS), horizontal=True)
+    key = (csv_name, tuple(locations), start_datetime, end_datetime, selected_hour, data_version(csv_name))
+    download_button("선택 그래프 데이터 다운로드", key, lambda: block_frame(times, block, locations),
+                    export_format, "selected_data", site["time_format"])
+
+
+# 이번 실행의 단계별 시간/행 수/바이트 수
+def show_timings(records):
+    with st.sidebar.expander("성능 정보", expanded=True):
+        if not records:
+            st.write("기록된 단계가 없습니다.")
+            return
+        st.dataframe(pd.DataFrame(records).round({"ms": 2}), hide_index=True, use_container_width=True)
+
+
+# 여러 사이트를 한 프로세스에서 보여주는 지하수위 관측 웹페이지
+# 사이트별 자료는 선택했을 때 처음 읽고, 이후에는 같은 프로세스의 캐시를 모든 사용자가 함께 씀
+def main(default_site=None):
+    # 새 자료 확인은 모든 세션이 함께 쓰는 백그라운드 스레드 하나가 맡음
+    refresher.start()
+    # GW_METRICS_PORT 가 있으면 이 프로세스의 단계별 누적 시간을 /metrics 로 내보냄
+    instrument.serve_metrics()
+    names = site_names()
+
+    # Sidebar (왼쪽 프레임)
+    st.sidebar.title("위치 리스트")
+
+    # 사이트 선택
+    site_name = st.sidebar.selectbox("사이트 선택", names, index=names.index(default_site) if default_site in names else 0)
+    site = get_site(site_name)
+    live = st.sidebar.checkbox("자동 갱신", value=False)
+    debug = st.sidebar.checkbox("성능 정보", value=False)
+
+    # 성능 정보를 켰거나 GW_TRACE/GW_TRACE_LOG/GW_METRICS_PORT 로 측정을 켠 경우에만 이번 실행의 단계별 시간을 기록
+    if debug or instrument.enabled():
+        instrument.begin_run()
+    try:
+        show_site(site)
+    finally:
+        records = instrument.end_run(site=site_name)
+    if debug:
+        show_timings(records)
+
+    # 자동 갱신: 자료 버전이 바뀔 때만 다시 그림
+    if live:
+        refresher.follow([site["csv"]], st.sidebar.empty())
+
+
+# 사이트 하나의 화면
+def show_site(site):
+    site_name = site["name"]
+    csv_name = site["csv"]
+
+    try:
+        # 위치 목록과 자료 기간 (자료 전체를 읽지 않음)
+        locations, min_time, max_time = describe(csv_name)
+    except Exception as e:
+        st.error(f"CSV 파일을 읽는 중 에러가 발생했습니다: {e}")
+        return
+    dropped = dropped_rows(csv_name)
+    if dropped:
+        st.warning(f"시간 형식을 읽지 못한 {dropped}행은 제외했습니다. 원본 CSV를 확인해 주세요.")
+
+    # 보기 방식: 한 위치, 또는 여러 위치를 겹쳐/나눠 보기
+    view_mode = st.sidebar.radio("보기", VIEW_MODES)
+
+    # 'Time'을 제외한 컬럼들을 선택 박스에 넣음
+    if view_mode == VIEW_MODES[0]:
+        selected_location = st.sidebar.selectbox("위치 선택", locations, key=f"{site_name}-location")
+    else:
+        selected_locations = st.sidebar.multiselect("위치 선택", locations, default=locations, key=f"{site_name}-locations")
+
+    dlt_nm = site["dlt_nm"]  # 차이를 볼 날짜
+
+    # 시작 날짜와 끝 날짜 선택
+    default_start_date = max_time - timedelta(days=dlt_nm) if (max_time - timedelta(days=dlt_nm)) > min_time else min_time
+
+    # 날짜 입력을 받을 수 있는지 확인
+    if min_time is None or max_time is None or default_start_date is None:
+        st.write("날짜 선택을 위한 변수 중 하나가 None입니다. 데이터를 확인해주세요.")
+        return
+
+    try:
+        hours = pd.date_range("00:00:00", "23:00:00", freq="H").strftime("%H:%M:%S")
+        start_date = st.sidebar.date_input("시작 날짜 선택", min_value=min_time.date(), max_value=max_time.date(), value=default_start_date.date(), key=f"{site_name}-start_date")
+        start_time = st.sidebar.selectbox("시작 시간 선택", options=hours, index=0)
+        end_date = st.sidebar.date_input("끝 날짜 선택", min_value=min_time.date(), max_value=max_time.date(), value=max_time.date(), key=f"{site_name}-end_date")
+        end_time = st.sidebar.selectbox("끝 시간 선택", options=hours, index=len(hours) - 1)
+
+        # datetime 객체로 변환
+        start_datetime = datetime.combine(start_date, datetime.strptime(start_time, "%H:%M:%S").time())
+        end_datetime = datetime.combine(end_date, datetime.strptime(end_time, "%H:%M:%S").time())
+
+        # 선택하는 시간 선택 (24는 전체 시간)
+        selected_hour = st.sidebar.selectbox("선택하는 시간", range(25), index=site["hour"])
+
+        # 슬라이더로 범위 크기 조절
+        rng_cmn = st.sidebar.slider("범위 크기", min_value=1, max_value=20, value=site["rng_cmn"], step=1)
+
+        if view_mode != VIEW_MODES[0]:
+            show_wells(site, selected_locations, view_mode, start_datetime, end_datetime, selected_hour)
+            return
+
+        # 그래프 자료 선택 (일/주/월 요약은 전체 시간 기준)
+        chart_mode = st.sidebar.radio("그래프 자료", ["원자료"] + list(ROLLUPS))
+        show_anomalies = st.sidebar.checkbox("이상 자료 표시", value=True)
+        fill_gaps = st.sidebar.checkbox("짧은 결측 보간", value=False)
+
+        # 시작 날짜와 끝 날짜 사이의 데이터 (선택한 위치만 읽음) 및 시간 필터링
+        # 자료는 이미 시간 오름차순으로 정렬되어 있음
+        filtered_data = load_csv(csv_name, columns=[selected_location], start=start_datetime, end=end_datetime,
+                                 hour=None if selected_hour == 24 else selected_hour)
+
+        # 데이터가 비어있는지 확인
+        if filtered_data.empty:
+            st.warning("선택된 기간에 해당하는 데이터가 없습니다.")
+            return
+
+        # Main content (오른쪽 프레임)
+        st.title("지하수위 관측 웹페이지")
+
+        # 이미지 표시
+        if site["image"]:
+            st.image(site["image"], use_column_width=True)
+
+        # Plot (오른쪽 아래 프레임)
+        start_str = start_datetime.strftime('%y년 %m월 %d일 %H시')
+        end_str = end_datetime.strftime('%y년 %m월 %d일 %H시')
+        st.subheader(f"{selected_location} 의 지하수위 ({start_str} 부터 {end_str})")
+
+        # 그래프 그리기 (원자료는 화면 폭에 맞게 점 개수를 줄이되 최고/최저 수위는 유지, 다운로드는 원본 자료)
+        title = f"{selected_location} 의 지하수위 그래프 ({start_str}부터 {end_str})"
+        # plotly 는 그래프가 실제로 필요할 때 불러옴 (처음 화면의 사이드바를 먼저 보냄)
+        import plotly.express as px
+
+        with instrument.stage("figure"):
+            if chart_mode == "원자료" and selected_hour == 24:
+                # 기간에 맞는 격자(1시간/1일)로 맞춰 그림. 결측 칸은 선을 끊고, 1일 격자는 최소~최대를 음영으로 표시
+                freq = pick_freq(start_datetime, end_datetime, point_budget(chart_width(site)))
+                plot_data = regular(csv_name, selected_location, freq, start_datetime, end_datetime,
+                                    interpolate_limit=INTERPOLATE_LIMIT if fill_gaps else 0)
+                plot_data = plot_data.rename(columns={"mean": selected_location})
+                fig = px.line(plot_data, x="Time", y=selected_location, title=f"{title} - {STEP_LABELS[freq]} 간격")
+                if freq != "h":
+                    fig.add_scatter(x=plot_data['Time'], y=plot_data['max'], mode="lines", line_width=0, showlegend=False, hoverinfo="skip")
+                    fig.add_scatter(x=plot_data['Time'], y=plot_data['min'], mode="lines", line_width=0, fill="tonexty", name="최소~최대", hoverinfo="skip")
+            elif chart_mode == "원자료":
+                plot_data = downsample(filtered_data, selected_location, point_budget(chart_width(site)))
+                fig = px.line(plot_data, x="Time", y=selected_location, title=title)
+            else:
+                plot_data = rollup(csv_name, selected_location, ROLLUPS[chart_mode], start_datetime, end_datetime)
+                plot_data = plot_data.rename(columns={"mean": selected_location})
+                fig = px.line(plot_data, x="Time", y=selected_location, hover_data=["min", "max", "count"], title=f"{title} - {chart_mode}")
+
+        # 이상 자료 표시 (튐/계단 변화/고착은 점, 결측 구간은 음영)
+        if show_anomalies:
+            add_anomalies(fig, anomaly.events(csv_name, selected_location, start_datetime, end_datetime))
+
+        # 선택한 위치에 대한 평균/최대/최소 값 (전체 시간이면 미리 계산된 기간 통계 사용)
+        if selected_hour == 24:
+            avg_value, mn_value, mx_value, _ = range_stats(csv_name, selected_location, start_datetime, end_datetime)
+        else:
+            avg_value, mn_value, mx_value, _ = summarize(filtered_data[selected_location].to_numpy())
+        rng_value = (mx_value - mn_value) * rng_cmn
+        rng_vale = rng_value / 2
+
+        # y 축 리미트 설정
+        fig.update_layout(yaxis=dict(range=[avg_value - rng_vale, avg_value + rng_vale]))
+
+        # x 축 tick 및 라벨 설정 (행 간격과 관계없이 기간을 5 등분)
+        first_time, last_time = plot_data['Time'].iloc[0], plot_data['Time'].iloc[-1]
+        if first_time < last_time:
+            tickvals = pd.date_range(first_time, last_time, periods=5)
+            ticktext = [val.strftime('%Y-%m-%d %H:%M') for val in tickvals]
+            fig.update_layout(xaxis=dict(tickvals=tickvals, ticktext=ticktext))
+
+        # 반응형으로 그래프 표시
+        with instrument.stage("chart_send"):
+            st.plotly_chart(fig, use_container_width=True)
+
+        # 다운로드 (버튼을 누를 때만 파일을 만들고, 같은 조건의 파일은 캐시에서 재사용)
+        export_format = st.radio("다운로드 형식", list(FORMATS), horizontal=True)
+        version = data_version(csv_name)
+        time_format = site["time_format"]  # CSV의 시간 형식
+
+        # 선택한 그래프의 시간과 데이터 다운로드 버튼
+        download_button("선택 그래프 데이터 다운로드", (csv_name, selected_location, start_datetime, end_datetime, selected_hour, version),
+                        lambda: filtered_data[['Time', selected_location]], export_format, "selected_data", time_format)
+
+        # 전체 데이터 다운로드 버튼
+        download_button("전체 자료 다운로드", (csv_name, version), lambda: load_csv(csv_name), export_format, "all_data", time_format)
+
+        # 선택 결과를 새로운 창에서 보여주기 (보여 줄 15행만 시간 문자열로 바꿈, 자료는 이미 시간순)
+        selected_data_preview = filtered_data[['Time', selected_location]].head(15).copy()
+        selected_data_preview['Time'] = selected_data_preview['Time'].dt.strftime('%Y-%m-%d %H:%M')  # 시간 형식 변경
+
+        # 인덱스를 감춤
+        selected_data_preview.set_index('Time', inplace=True)
+
+        # 왼쪽 프레임에 데이터를 미리보는 창
+        st.sidebar.subheader("선택된 자료 미리보기")
+        st.sidebar.write(selected_data_preview)
+    except Exception as e:
+        st.error(f"날짜 선택 중 에러가 발생했습니다: {e}")
+
+
+if __name__ == "__main__":
+    main()
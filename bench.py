@@ -0,0 +1,327 @@
+import argparse
+import base64
+import io
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+import sites
+from downsample import downsample
+from export import iter_export
+from stats_cache import RangeStats
+from ts_index import TimeIndex
+
+# 화면 자료 경로 성능 측정
+# 가짜 관측 CSV(행 수 x 관측정 수)를 만들고 단계별 시간을 따로 재며, AppTest 로 동시 세션도 흉내냄
+# 결과는 JSON 으로 저장해서 버전 사이의 차이를 비교할 수 있음
+#
+# 사용법: python bench.py [--sizes 10k,1m,10m] [--wells 15,100] [--sessions 4] [--startup] [--out bench.json]
+#         python bench.py --compare old.json new.json
+SIZES = {"10k": 10_000, "1m": 1_000_000, "10m": 10_000_000}
+DEFAULT_SIZES = "10k,1m"
+DEFAULT_WELLS = "15"
+REPEAT = 5
+WRITE_CHUNK_ROWS = 200_000
+BENCH_SITE = "bench"
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# 1시간 간격, 관측정마다 다른 기준 수위에서 출발하는 랜덤워크 (cgwt_nnhn.csv 와 같은 형식)
+def make_csv(path, rows, wells, seed=0):
+    rng = np.random.default_rng(seed)
+    names = [f"WA{k + 1:02d}" for k in range(wells)]
+    level = rng.uniform(-15, -5, wells)
+    start = pd.Timestamp("2020-01-01")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(",".join(["Time"] + names) + "\n")
+        for i in range(0, rows, WRITE_CHUNK_ROWS):
+            n = min(WRITE_CHUNK_ROWS, rows - i)
+            steps = rng.normal(0, 0.01, (n, wells))
+            values = level + np.cumsum(steps, axis=0)
+            level = values[-1]
+            chunk = pd.DataFrame(np.round(values, 2), columns=names)
+            chunk.insert(0, "Time", pd.date_range(start + pd.Timedelta(hours=i), periods=n, freq="h"))
+            chunk.to_csv(f, header=False, index=False, date_format="%Y-%m-%d %H:%M:%S")
+    return names
+
+
+def _percentiles(samples):
+    samples = np.asarray(samples, dtype=np.float64) * 1000
+    return {
+        "n": len(samples),
+        "min_ms": float(samples.min()),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p90_ms": float(np.percentile(samples, 90)),
+        "p99_ms": float(np.percentile(samples, 99)),
+        "max_ms": float(samples.max()),
+    }
+
+
+# 프로세스 시작 후 최대 메모리 (앞 경우의 최댓값이 이어짐). 리눅스는 KB 단위
+# RUSAGE_CHILDREN 은 끝난 세션 프로세스 중 가장 큰 값
+def _peak_rss_mb(who=resource.RUSAGE_SELF):
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def _time(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - t)
+    return result, samples
+
+
+# 화면 한 번 그릴 때의 단계별 시간
+def bench_stages(path, names, repeat=REPEAT):
+    import plotly.express as px
+
+    with open(path, "rb") as f:
+        data = f.read()
+    results = {}
+
+    # 첫 호출(지연 import, 캐시 준비)은 빼고 잼. 한 번만 재는 단계는 그대로
+    def stage(name, fn, times=repeat):
+        if times > 1:
+            fn()
+        result, samples = _time(fn, times)
+        results[name] = _percentiles(samples)
+        return result
+
+    raw = stage("load", lambda: pd.read_csv(io.BytesIO(data), encoding="utf-8-sig"))
+    raw['Time'] = stage("parse", lambda: data_loader.parse_time(raw['Time']))
+    index = stage("index", lambda: TimeIndex(raw))
+
+    well = names[0]
+    end = raw['Time'].iloc[-1]
+    start = end - pd.Timedelta(days=7)
+    stage("range_filter", lambda: index.select(start, end, [well]))
+    stage("hour_filter", lambda: index.select(None, None, [well], hour=12))
+    stage("stats_build", lambda: RangeStats(index.data.values(well)))
+    stage("stats", lambda: index.range_stats(well, raw['Time'].iloc[0], end))
+
+    # 전체 기간 그래프 (점 줄이기 + 그림 만들기 + JSON 직렬화)
+    whole = index.select(None, None, [well])
+    stage("figure", lambda: px.line(downsample(whole, well), x="Time", y=well).to_json())
+
+    # 선택 기간 CSV 와 base64 (예전 다운로드 링크 방식)
+    selected = index.select(start, end, [well])
+    csv = stage("export_csv", lambda: b"".join(iter_export(selected, "csv")))
+    stage("base64", lambda: base64.b64encode(csv))
+    stage("export_all_csv", lambda: b"".join(iter_export(raw, "csv")), times=1)
+    return results
+
+
+# 세션 하나: 같은 화면을 reruns 번 다시 그리는 시간 (첫 번째는 자료를 처음 읽는 시간 포함)
+def _session(script, reruns):
+    from streamlit.testing.v1 import AppTest
+
+    samples = []
+    at = AppTest.from_file(script, default_timeout=600)
+    for _ in range(reruns):
+        t = time.perf_counter()
+        at.run()
+        samples.append(time.perf_counter() - t)
+        if at.exception:
+            raise RuntimeError(at.exception[0].value)
+    return samples
+
+
+# 동시 세션 N 개가 각각 reruns 번 화면을 다시 그리는 시간
+# AppTest 는 프로세스 전역 Runtime 을 쓰므로 한 프로세스에서 동시에 돌릴 수 없어 세션마다 프로세스를 나눔
+def bench_sessions(n_sessions, reruns, work_dir):
+    script = os.path.join(work_dir, "bench_app.py")
+    with open(script, "w", encoding="utf-8") as f:
+        f.write(f"from app import main\nmain(default_site={BENCH_SITE!r})\n")
+
+    t = time.perf_counter()
+    with ProcessPoolExecutor(n_sessions) as pool:
+        results = list(pool.map(_session, [script] * n_sessions, [reruns] * n_sessions))
+    elapsed = time.perf_counter() - t
+    samples = [s for result in results for s in result]
+    return {**_percentiles(samples), "first_run": _percentiles([r[0] for r in results]),
+            "sessions": n_sessions, "reruns": reruns, "runs_per_second": len(samples) / elapsed,
+            "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN)}
+
+
+# 새 프로세스에서 첫 화면을 그리기까지의 시간
+# cold: 프로세스 시작 -> import -> 자료 읽기 -> 첫 화면 완료
+# warm: warmup.prewarm() (serve.py 가 서버 시작 때 하는 일) 뒤 첫 방문자의 화면 시간
+_FIRST_RENDER = """
+import json, sys, time
+t0 = float(sys.argv[1])
+if sys.argv[2] == "1":
+    import warmup
+    warmup.prewarm()
+t_import = time.time()
+import app
+import_ms = (time.time() - t_import) * 1000
+from streamlit.testing.v1 import AppTest
+t = time.time()
+at = AppTest.from_file("app.py", default_timeout=600).run()
+print(json.dumps({"process_ms": (time.time() - t0) * 1000, "render_ms": (time.time() - t) * 1000,
+                  "import_ms": import_ms, "errors": [str(e.value) for e in at.exception]}))
+"""
+
+
+def _first_render(prewarm):
+    env = {**os.environ, "GW_DATA_LOCAL": "1"}
+    t0 = time.time()
+    out = subprocess.run([sys.executable, "-c", _FIRST_RENDER, repr(t0), "1" if prewarm else "0"], cwd=REPO_DIR,
+                         env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+# serve.py 를 띄워서 health 응답이 올 때까지의 시간
+def _server_ready(timeout=120):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    env = {**os.environ, "GW_DATA_LOCAL": "1"}
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "serve.py", "--server.headless", "true", "--server.port", str(port)],
+                            cwd=REPO_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - t0 < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1):
+                    return time.perf_counter() - t0
+            except OSError:
+                time.sleep(0.05)
+        raise RuntimeError("serve.py 가 제시간에 뜨지 않았습니다.")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def bench_startup(repeat):
+    cold = [_first_render(False) for _ in range(repeat)]
+    warm = [_first_render(True) for _ in range(repeat)]
+    return {
+        "import_app": _percentiles([r["import_ms"] / 1000 for r in cold]),
+        "first_render_cold": _percentiles([r["process_ms"] / 1000 for r in cold]),
+        "first_render_prewarmed": _percentiles([r["render_ms"] / 1000 for r in warm]),
+        "server_ready": _percentiles([_server_ready() for _ in range(repeat)]),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=REPO_DIR).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(sizes, wells_list, n_sessions, reruns, repeat, work_dir, startup=False):
+    report = {
+        "revision": _git_revision(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "cases": [],
+    }
+    if startup:
+        # 실제 사이트 자료(로컬 사본)로 첫 화면 시간을 잼
+        report["startup"] = bench_startup(repeat)
+        for stage, stats in report["startup"].items():
+            print(f"  {stage:22s} p50 {stats['p50_ms']:10.2f} ms   max {stats['max_ms']:10.2f} ms", flush=True)
+    # 가짜 사이트는 로컬 파일만 읽음
+    data_loader.LOCAL_ONLY = True
+    data_loader.LOCAL_DIR = work_dir
+    for size in sizes:
+        for wells in wells_list:
+            name = f"bench_{size}_{wells}.csv"
+            path = os.path.join(work_dir, name)
+            t = time.perf_counter()
+            names = make_csv(path, SIZES[size], wells)
+            print(f"{name}: {os.path.getsize(path) / 1e6:.1f} MB ({time.perf_counter() - t:.1f}s)", flush=True)
+
+            case = {"rows": SIZES[size], "wells": wells, "csv_bytes": os.path.getsize(path)}
+            case["stages"] = bench_stages(path, names, repeat)
+            if n_sessions:
+                sites.register(BENCH_SITE, name)
+                data_loader.clear_cache()
+                try:
+                    case["sessions"] = bench_sessions(n_sessions, reruns, work_dir)
+                except (BrokenProcessPool, RuntimeError) as e:
+                    # 메모리가 모자라 세션 프로세스가 죽는 경우 등: 단계별 결과는 그대로 남김
+                    case["sessions"] = {"error": repr(e)}
+            case["peak_rss_mb"] = _peak_rss_mb()
+            report["cases"].append(case)
+            for stage, stats in case["stages"].items():
+                print(f"  {stage:15s} p50 {stats['p50_ms']:10.2f} ms   p90 {stats['p90_ms']:10.2f} ms")
+            if n_sessions and "error" in case["sessions"]:
+                print(f"  {'sessions':15s} {case['sessions']['error']}")
+            elif n_sessions:
+                s = case["sessions"]
+                print(f"  {'sessions':15s} p50 {s['p50_ms']:10.2f} ms   p99 {s['p99_ms']:10.2f} ms   {s['runs_per_second']:.1f} runs/s"
+                      f"   session RSS {s['peak_rss_mb']:.0f} MB")
+            print(f"  peak RSS {case['peak_rss_mb']:.0f} MB", flush=True)
+            os.remove(path)
+    return report
+
+
+# 두 결과 파일의 같은 경우(행 수, 관측정 수)끼리 단계별 p50 비교
+def compare(old, new):
+    old_cases = {(c["rows"], c["wells"]): c for c in old["cases"]}
+    print(f"{old.get('revision')} -> {new.get('revision')}")
+    for stage, stats in new.get("startup", {}).items():
+        if stage in old.get("startup", {}):
+            a, b = old["startup"][stage]["p50_ms"], stats["p50_ms"]
+            print(f"  {stage:22s} {a:10.2f} -> {b:10.2f} ms  ({b / a if a else float('nan'):.2f}x)")
+    for case in new["cases"]:
+        before = old_cases.get((case["rows"], case["wells"]))
+        if before is None:
+            continue
+        print(f"{case['rows']}행 x {case['wells']}개")
+        pairs = [(stage, before["stages"].get(stage), stats) for stage, stats in case["stages"].items()]
+        if "p50_ms" in case.get("sessions", {}) and "p50_ms" in before.get("sessions", {}):
+            pairs.append(("sessions", before["sessions"], case["sessions"]))
+        for stage, old_stats, new_stats in pairs:
+            if old_stats is not None:
+                a, b = old_stats["p50_ms"], new_stats["p50_ms"]
+                print(f"  {stage:15s} {a:10.2f} -> {b:10.2f} ms  ({b / a if a else float('nan'):.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="지하수위 화면 자료 경로 성능 측정")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"행 수 ({', '.join(SIZES)})")
+    parser.add_argument("--wells", default=DEFAULT_WELLS, help="관측정 수 (쉼표로 여러 개)")
+    parser.add_argument("--sessions", type=int, default=4, help="동시 AppTest 세션 수 (0 이면 생략)")
+    parser.add_argument("--reruns", type=int, default=3, help="세션마다 다시 그리는 횟수")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="단계마다 반복 횟수")
+    parser.add_argument("--startup", action="store_true", help="첫 화면까지의 시간도 잼 (import, 미리 읽기 전후, 서버 시작)")
+    parser.add_argument("--out", default="bench.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f_old, open(args.compare[1]) as f_new:
+            compare(json.load(f_old), json.load(f_new))
+        return
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        report = run(args.sizes.split(","), [int(w) for w in args.wells.split(",")],
+                     args.sessions, args.reruns, args.repeat, work_dir, args.startup)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"-> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
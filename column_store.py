@@ -0,0 +1,240 @@
+import copy
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from instrument import timed
+
+# 사이트별 열 저장소 위치: store/<사이트>/<YYYY-MM>.parquet + manifest.json
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "store")
+MANIFEST = "manifest.json"
+# 수위는 float32 로 저장하므로 읽을 때 원본의 소수 자릿수로 반올림함 (자릿수를 모르면 이 값)
+MAX_DECIMALS = 6
+
+
+def _site_dir(site, store_dir):
+    return os.path.join(store_dir, site)
+
+
+# 임시 파일에 쓰고 교체해서 읽는 쪽이 반쯤 쓰인 파일을 보지 않도록 함
+# 임시 파일 이름에 프로세스 번호를 붙여 여러 프로세스가 같은 파일을 써도 섞이지 않게 함
+def _atomic_write(path, write):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    write(tmp)
+    os.replace(tmp, path)
+
+
+# manifest 파일 경로 -> (수정 시각, 크기, 읽은 manifest)
+_manifests = {}
+
+
+# 파일이 그대로면 앞서 읽은 manifest 를 그대로 돌려줌 (호출하는 쪽은 고치지 말 것)
+def read_manifest(site, store_dir=STORE_DIR):
+    path = os.path.join(_site_dir(site, store_dir), MANIFEST)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        _manifests.pop(path, None)
+        return None
+    cached = _manifests.get(path)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    _manifests[path] = (stat.st_mtime_ns, stat.st_size, manifest)
+    return manifest
+
+
+def has_site(site, store_dir=STORE_DIR):
+    return read_manifest(site, store_dir) is not None
+
+
+# 저장소가 바뀔 때마다 달라지는 값 (manifest 수정 시각)
+def version(site, store_dir=STORE_DIR):
+    return os.stat(os.path.join(_site_dir(site, store_dir), MANIFEST)).st_mtime_ns
+
+
+# Time은 int64 epoch 초, 수위는 float32 로 변환한 Arrow 테이블
+def _to_table(df, columns):
+    arrays = [pa.array(df['Time'].values.astype("datetime64[s]").astype(np.int64))]
+    arrays += [pa.array(df[c].to_numpy(dtype=np.float32)) for c in columns]
+    return pa.Table.from_arrays(arrays, names=['Time'] + list(columns))
+
+
+def _write_manifest(site_dir, manifest):
+    def write(tmp):
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+    _atomic_write(os.path.join(site_dir, MANIFEST), write)
+
+
+# 파티션 파일 이름. manifest 항목에 file 이 없으면 <YYYY-MM>.parquet
+def _partition_file(month, part):
+    return part.get("file", f"{month}.parquet")
+
+
+# float32 로 저장한 값을 원래대로 되돌리는 가장 작은 소수 자릿수
+def _decimals(values):
+    values = values[~np.isnan(values)]
+    for d in range(MAX_DECIMALS):
+        if np.array_equal(np.round(values.astype(np.float64), d).astype(np.float32), values):
+            return d
+    return MAX_DECIMALS
+
+
+# 한 달 자료(Time 오름차순, columns 순서)를 파티션 파일로 쓰고 manifest 항목을 반환
+# file 을 주면 그 이름으로 써서 manifest 를 바꾸기 전까지 기존 파일을 건드리지 않음
+def write_partition(site, month, part, columns, store_dir=STORE_DIR, file=None):
+    site_dir = _site_dir(site, store_dir)
+    os.makedirs(site_dir, exist_ok=True)
+    table = _to_table(part, columns)
+    path = os.path.join(site_dir, file or f"{month}.parquet")
+    _atomic_write(path, lambda tmp: pq.write_table(table, tmp))
+    epoch = table.column('Time')
+    levels = part[list(columns)].to_numpy(dtype=np.float32).ravel()
+    entry = {"start": epoch[0].as_py(), "end": epoch[-1].as_py(), "rows": table.num_rows,
+             "decimals": _decimals(levels)}
+    if file:
+        entry["file"] = file
+    return entry
+
+
+# manifest 가 가리키는 파티션 파일 이름
+def _used_files(manifest):
+    if manifest is None:
+        return set()
+    return {_partition_file(month, part) for month, part in manifest["partitions"].items()}
+
+
+# 새 manifest 도, 바로 이전 manifest 도 가리키지 않는 파티션 파일을 지움 (keep: 이전 manifest 의 파일)
+# 이전 manifest 를 읽어 둔 쪽이 아직 그 파일을 읽고 있을 수 있으므로 한 세대 전 파일은 다음 교체 때 지움
+def _remove_unused(site_dir, manifest, keep=()):
+    used = _used_files(manifest) | set(keep)
+    for file in os.listdir(site_dir):
+        if file.endswith(".parquet") and file not in used:
+            os.remove(os.path.join(site_dir, file))
+
+
+# manifest 를 통째로 바꾸고 더는 쓰지 않는 파티션 파일을 지움
+# 읽는 쪽은 manifest 가 바뀌는 순간 새 자료로 넘어감
+def replace_site(site, manifest, store_dir=STORE_DIR):
+    site_dir = _site_dir(site, store_dir)
+    os.makedirs(site_dir, exist_ok=True)
+    keep = _used_files(read_manifest(site, store_dir))
+    _write_manifest(site_dir, manifest)
+    _remove_unused(site_dir, manifest, keep)
+
+
+# 'YYYY-MM' 별 (달, 그 달의 행). 문자열 변환은 달마다 한 번만 함
+def split_months(df):
+    months = df['Time'].values.astype("datetime64[M]")
+    for month, part in df.groupby(months, sort=True):
+        yield str(np.datetime64(month, "M")), part
+
+
+# DataFrame(Time + 관측정 열)을 월별 파티션으로 저장
+# 이미 있는 달은 기존 행과 합쳐서 다시 씀: 같은 시간의 df 에 있는 열은 새 값으로 바꾸고 (비어 있으면 비움),
+# df 에 없는 열과 시간은 기존 값을 그대로 둠. 나머지 달은 그대로 둠
+# source 는 원본 CSV 의 위치 (data_loader.local_source). 읽는 쪽은 그 뒤에 붙은 행만 원본에서 이어받음
+def write_site(site, df, store_dir=STORE_DIR, source=None):
+    site_dir = _site_dir(site, store_dir)
+    os.makedirs(site_dir, exist_ok=True)
+    manifest = copy.deepcopy(read_manifest(site, store_dir)) or {"columns": [], "partitions": {}}
+    keep = _used_files(manifest)
+    if source is not None:
+        manifest["source"] = source
+    elif "source" in manifest:
+        # 원본 파일과 달라지므로 precompute.py 가 다음에 원본 해시만 보고 건너뛰지 않게 함
+        manifest["source"].pop("sha256", None)
+    columns = list(manifest["columns"])
+    columns += [c for c in df.columns if c != 'Time' and c not in columns]
+
+    for month, part in split_months(df):
+        part = part.drop_duplicates(subset='Time', keep='last').set_index('Time')
+        if month in manifest["partitions"]:
+            old = read_site(site, store_dir=store_dir, months=[month]).set_index('Time')
+            merged = old.reindex(index=old.index.union(part.index), columns=columns)
+            merged.loc[part.index, list(part.columns)] = part.to_numpy(dtype=np.float64)
+            part = merged
+        part = part.sort_index().reindex(columns=columns).reset_index()
+        manifest["partitions"][month] = write_partition(site, month, part, columns, store_dir)
+
+    manifest["columns"] = columns
+    manifest["partitions"] = dict(sorted(manifest["partitions"].items()))
+    _write_manifest(site_dir, manifest)
+    _remove_unused(site_dir, manifest, keep)
+    return manifest
+
+
+# manifest 에 적힌 전체 기간 (처음, 마지막 시각)
+def time_range(manifest):
+    parts = list(manifest["partitions"].values())
+    start = pd.Timestamp(min(p["start"] for p in parts), unit="s")
+    end = pd.Timestamp(max(p["end"] for p in parts), unit="s")
+    return start, end
+
+
+# 저장된 관측정 목록과 전체 기간 (자료를 읽지 않고 manifest만 사용)
+def site_info(site, store_dir=STORE_DIR):
+    manifest = read_manifest(site, store_dir)
+    return (manifest["columns"], *time_range(manifest))
+
+
+def _epoch(value):
+    return int(pd.Timestamp(value).timestamp())
+
+
+# manifest 에서 기간에 겹치는 달의 파티션을 읽음. (Arrow 테이블 목록, 소수 자릿수)
+def _read_partitions(site, manifest, columns, lo, hi, months, store_dir):
+    tables = []
+    decimals = 0
+    for month, part in manifest["partitions"].items():
+        if months is not None and month not in months:
+            continue
+        if (lo is not None and part["end"] < lo) or (hi is not None and part["start"] > hi):
+            continue
+        path = os.path.join(_site_dir(site, store_dir), _partition_file(month, part))
+        parquet = pq.ParquetFile(path, memory_map=True)
+        names = parquet.schema_arrow.names
+        table = parquet.read(columns=['Time'] + [c for c in columns if c in names])
+        # 나중에 추가된 관측정은 예전 파티션에 없으므로 빈 열로 채움
+        for c in columns:
+            if c not in names:
+                table = table.append_column(c, pa.nulls(table.num_rows, pa.float32()))
+        tables.append(table.select(['Time'] + columns))
+        decimals = max(decimals, part.get("decimals", MAX_DECIMALS))
+    return tables, decimals
+
+
+# 필요한 열과 기간에 겹치는 달만 읽어서 DataFrame으로 반환
+# 수위는 float64 로 바꾸고 원본의 소수 자릿수로 반올림함 (float32 오차 -8.9799995 -> -8.98)
+@timed("store_read")
+def read_site(site, columns=None, start=None, end=None, store_dir=STORE_DIR, months=None):
+    manifest = read_manifest(site, store_dir)
+    columns = manifest["columns"] if columns is None else list(columns)
+    lo = None if start is None else _epoch(start)
+    hi = None if end is None else _epoch(end)
+    try:
+        tables, decimals = _read_partitions(site, manifest, columns, lo, hi, months, store_dir)
+    except FileNotFoundError:
+        # manifest 를 읽은 뒤 저장소가 두 번 이상 바뀌어 파일이 지워졌으면 새 manifest 로 한 번 더 읽음
+        manifest = read_manifest(site, store_dir)
+        tables, decimals = _read_partitions(site, manifest, columns, lo, hi, months, store_dir)
+
+    if not tables:
+        return pd.DataFrame({'Time': pd.Series([], dtype="datetime64[ns]"),
+                             **{c: pd.Series([], dtype=np.float64) for c in columns}})
+
+    df = pa.concat_tables(tables).to_pandas()
+    epoch = df['Time'].to_numpy()
+    i = 0 if lo is None else np.searchsorted(epoch, lo, side="left")
+    j = len(epoch) if hi is None else np.searchsorted(epoch, hi, side="right")
+    df = df.iloc[i:j].reset_index(drop=True)
+    df['Time'] = pd.to_datetime(df['Time'], unit="s")
+    for c in columns:
+        df[c] = np.round(df[c].to_numpy(dtype=np.float64), decimals)
+    return df
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+# 사이트 자료의 메모리 절약 표현
+# 수위: cm 단위 정수로 정확히 나타낼 수 있는 열은 int16 (결측은 MISSING_CM), 아니면 float64
+# (float32 로 줄이면 -14.275 가 -14.2749996 으로 바뀌어 API/그래프 값에 오차가 보이므로 쓰지 않음)
+# 시간: 모두 정시이면 기준 시각부터의 시간 수(int32), 아니면 datetime64 그대로
+# 조회한 행만 float/datetime 으로 풀어 DataFrame 을 만들고, 시간 문자열 변환은 내보내기/화면 끝에서만 함
+MISSING_CM = np.iinfo(np.int16).min
+MAX_CM = np.iinfo(np.int16).max
+HOUR = np.timedelta64(1, "h")
+
+
+def encode_levels(values):
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    cm = np.round(values * 100)
+    # 소수 둘째 자리까지의 값이고 int16 범위 안이면 원래 값으로 정확히 되돌릴 수 있음
+    if (np.abs(cm[valid]) <= MAX_CM).all() and (cm[valid] / 100 == values[valid]).all():
+        return np.where(valid, cm, MISSING_CM).astype(np.int16)
+    return values
+
+
+def decode_levels(stored):
+    if stored.dtype != np.int16:
+        return stored
+    values = stored / 100
+    values[stored == MISSING_CM] = np.nan
+    return values
+
+
+def encode_times(times):
+    times = np.asarray(times, dtype="datetime64[ns]")
+    if len(times) == 0:
+        return None, times
+    origin = times[0]
+    offsets = times - origin
+    on_hour = origin.astype("datetime64[h]") == origin
+    if on_hour and (offsets % HOUR == np.timedelta64(0)).all():
+        hours = offsets // HOUR
+        if hours[-1] <= np.iinfo(np.int32).max:
+            return origin, hours.astype(np.int32)
+    return None, times
+
+
+class CompactFrame:
+    def __init__(self, origin, times, levels):
+        self.origin = origin        # 시간 수의 기준 시각 (None 이면 times 가 datetime64)
+        self._times = times         # int32 시간 수 또는 datetime64[ns]
+        self.levels = levels        # 열 이름 -> int16 cm 또는 float64 배열
+
+    @classmethod
+    def from_frame(cls, df):
+        origin, times = encode_times(df['Time'].to_numpy())
+        return cls(origin, times, {c: encode_levels(df[c].to_numpy()) for c in df.columns if c != 'Time'})
+
+    # 열만 있고 행이 없는 자료
+    @classmethod
+    def empty(cls, columns):
+        return cls(None, np.array([], dtype="datetime64[ns]"), {c: np.array([], dtype=np.float64) for c in columns})
+
+    def __len__(self):
+        return len(self._times)
+
+    @property
+    def columns(self):
+        return list(self.levels)
+
+    @property
+    def nbytes(self):
+        return self._times.nbytes + sum(v.nbytes for v in self.levels.values())
+
+    def times(self, rows=slice(None)):
+        if self.origin is None:
+            return self._times[rows]
+        return self.origin + self._times[rows].astype(np.int64) * HOUR
+
+    def first_time(self):
+        return pd.Timestamp(self.times(slice(0, 1))[0])
+
+    def last_time(self):
+        return pd.Timestamp(self.times(slice(-1, None))[0])
+
+    # 시각 t 가 들어갈 행 위치 (np.searchsorted 와 같은 의미)
+    def search(self, t, side="left"):
+        t = np.datetime64(pd.Timestamp(t), "ns")
+        if self.origin is None:
+            return int(np.searchsorted(self._times, t, side=side))
+        offset = (t - self.origin) / HOUR
+        # 정시가 아닌 시각은 left 는 다음 정시, right 는 이전 정시 기준
+        hour = np.ceil(offset) if side == "left" else np.floor(offset)
+        hour = min(max(hour, -1), np.iinfo(np.int32).max)
+        # 같은 int32 로 찾아야 배열 전체를 int64 로 바꾸는 복사가 생기지 않음
+        return int(np.searchsorted(self._times, np.int32(hour), side=side))
+
+    # 시간대(0~23시) 배열 (시간대별 행 목록을 만들 때 한 번 씀)
+    def hour_of_day(self):
+        if self.origin is None:
+            return (self._times.astype("datetime64[h]").astype(np.int64) % 24).astype(np.int8)
+        start = int(self.origin.astype("datetime64[h]").astype(np.int64) % 24)
+        return ((self._times + start) % 24).astype(np.int8)
+
+    # 한 열의 값 (float64 열은 복사 없는 슬라이스, int16 cm 열은 요청한 행만 float64 로 풂)
+    def values(self, column, rows=slice(None)):
+        return decode_levels(self.levels[column][rows])
+
+    def frame(self, rows=slice(None), columns=None):
+        columns = self.columns if columns is None else list(columns)
+        data = {'Time': self.times(rows)}
+        data.update({c: self.values(c, rows) for c in columns})
+        return pd.DataFrame(data, copy=False)
+
+    # i 번째 행부터의 자료 (앞부분 배열을 놓아 주도록 복사)
+    def since(self, i):
+        return CompactFrame(self.origin, self._times[i:].copy(), {c: v[i:].copy() for c, v in self.levels.items()})
+
+    # 새 행(DataFrame)을 덧붙인 CompactFrame (기존 배열은 그대로 두고 새로 만듦)
+    def append(self, df):
+        if len(df) == 0:
+            return self
+        if len(self) == 0:
+            return CompactFrame.from_frame(df)
+        origin, times = encode_times(np.concatenate([self.times(slice(-1, None)), df['Time'].to_numpy()]))
+        if self.origin is not None and origin is not None:
+            times = (times[1:] + self._times[-1]).astype(np.int32)
+            times = np.concatenate([self._times, times])
+            origin = self.origin
+        else:
+            origin, times = encode_times(np.concatenate([self.times(), df['Time'].to_numpy()]))
+        levels = {}
+        for c in self.columns:
+            new = encode_levels(df[c].to_numpy() if c in df else np.full(len(df), np.nan))
+            old = self.levels[c]
+            if old.dtype != new.dtype:
+                old, new = decode_levels(old), decode_levels(new)
+            levels[c] = np.concatenate([old, new])
+        return CompactFrame(origin, times, levels)
@@ -0,0 +1,442 @@
+import io
+import itertools
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+import pandas as pd
+
+import column_store
+from compact import CompactFrame
+from instrument import stage
+from resample import STEPS, Grid
+from stats_cache import rollup as rollup_frame, rollup_range, summarize
+from ts_index import TimeIndex
+
+# 관측 자료 원격 저장소 (GitHub raw) 와 로컬 사본 위치
+# GW_DATA_URL 로 다른 HTTP 주소(로컬 테스트 서버 등)를, GW_DATA_LOCAL=1 로 로컬 파일만 쓰도록 바꿀 수 있음
+BASE_URL = os.environ.get("GW_DATA_URL", "https://raw.githubusercontent.com/cgwatertech/GW_mnt/main/")
+LOCAL_DIR = os.path.dirname(os.path.abspath(__file__))
+LOCAL_ONLY = os.environ.get("GW_DATA_LOCAL") == "1"
+
+# 캐시 유효 시간(초): 이 시간 안의 재실행은 네트워크 요청 없이 메모리의 자료를 그대로 사용
+TTL_SECONDS = 300
+TIMEOUT_SECONDS = 10
+
+# 사이트마다 다른 시간 표기 형식 ('2023.9.23 20:00', '2024-7-25 13:00:00')
+TIME_FORMATS = ["%Y.%m.%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"]
+
+# 원본의 마지막 줄을 찾을 때 읽는 끝부분 크기
+SOURCE_TAIL_BYTES = 64 * 1024
+
+_cache = {}
+_locks = {}
+_locks_guard = threading.Lock()
+
+# 자료가 바뀔 때마다 새 번호를 붙임 (캐시를 비워도 번호는 겹치지 않음)
+_versions = itertools.count(1)
+
+# 열 저장소 사이트의 일/주/월 요약을 만들 때 기간 앞뒤로 더 읽는 길이 (가장 긴 요약 구간인 한 달)
+ROLLUP_PAD = pd.Timedelta(days=31)
+
+# 백그라운드 갱신(refresher.py)이 켜져 있으면 화면 쪽에서는 TTL 이 지나도 다시 받지 않음
+_background = False
+
+
+class _Entry:
+    def __init__(self, data, etag=None, size=0, tail=b"", source="remote"):
+        self.data = data        # Time 기준으로 정렬된 compact.CompactFrame
+        self.etag = etag        # 마지막 응답의 ETag (로컬 파일은 수정 시각)
+        self.size = size        # 지금까지 받은 원본 바이트 수
+        self.tail = tail        # 원본의 마지막 줄 (이어받기 검증용)
+        self.source = source    # 'remote' 또는 'local'
+        self.checked_at = time.monotonic()
+        self.version = next(_versions)
+        self.lineage = self.version  # 새 행만 덧붙인 항목은 이전 항목의 값을 이어받음 (처음부터 다시 읽으면 바뀜)
+        self.dropped = 0        # 시각을 읽지 못해 뺀 행 수
+        self.store_version = None  # 열 저장소 사이트면 이 항목을 맞춘 저장소 버전 (data 는 저장소 이후의 행만)
+        self._index = None
+
+    # 기간/시간대 조회용 색인 (처음 쓸 때 한 번만 만듦)
+    def time_index(self):
+        if self._index is None:
+            self._index = TimeIndex(self.data)
+        return self._index
+
+
+# 알려진 형식을 순서대로 시도하고, 모두 실패하면 pandas 추론에 맡김
+def parse_time(values):
+    for fmt in TIME_FORMATS:
+        try:
+            return pd.to_datetime(values, format=fmt)
+        except (ValueError, TypeError):
+            continue
+    return pd.to_datetime(values, errors='coerce')
+
+
+# (DataFrame, 시각을 읽지 못해 뺀 행 수)
+def _parse(data, names=None):
+    with stage("read_csv", nbytes=len(data)) as s:
+        if names is None:
+            df = pd.read_csv(io.BytesIO(data), encoding='utf-8-sig')
+        else:
+            df = pd.read_csv(io.BytesIO(data), header=None, names=names, encoding='utf-8-sig')
+        s.add(rows=len(df))
+    with stage("parse_time", rows=len(df)):
+        df['Time'] = parse_time(df['Time'])
+        bad = df['Time'].isna()
+        dropped = int(bad.sum())
+        if dropped:
+            df = df[~bad]
+        return df.sort_values(by='Time', kind='mergesort').reset_index(drop=True), dropped
+
+
+# 원본 전체로 만든 항목. 메모리에는 압축 표현 (int16 cm / float64 수위, int32 시간 수)으로 둠
+def _full_entry(data, etag, source="remote"):
+    df, dropped = _parse(data)
+    entry = _Entry(CompactFrame.from_frame(df), etag, len(data), _last_line(data), source)
+    entry.dropped = dropped
+    return entry
+
+
+# 원본의 마지막 줄 (줄바꿈 포함)
+def _last_line(data):
+    body = data.rstrip(b"\r\n")
+    start = body.rfind(b"\n") + 1
+    return data[start:]
+
+
+def _request(url, headers):
+    req = urllib.request.Request(url, headers=headers)
+    try:
+        with stage("fetch") as s, urllib.request.urlopen(req, timeout=TIMEOUT_SECONDS) as resp:
+            data = resp.read()
+            s.add(nbytes=len(data))
+            return resp.status, resp.headers, data
+    except urllib.error.HTTPError as e:
+        # 304(변경 없음), 416(범위 오류)은 호출하는 쪽에서 처리
+        if e.code in (304, 416):
+            return e.code, e.headers, b""
+        raise
+
+
+def _full_fetch(url):
+    status, headers, data = _request(url, {})
+    return _full_entry(data, headers.get("ETag"))
+
+
+def _local_path(name):
+    return os.path.join(LOCAL_DIR, name)
+
+
+def _load_local(name):
+    path = _local_path(name)
+    mtime = os.stat(path).st_mtime_ns
+    with open(path, "rb") as f:
+        data = f.read()
+    return _full_entry(data, mtime, source="local")
+
+
+# 이전 자료의 마지막 줄부터 시작하는 data 에서 새 행만 덧붙인 항목을 만듦
+# 이어지는 자료가 아니면 (파일이 줄었거나 앞부분/마지막 줄이 바뀜) None: 전체를 다시 읽어야 함
+def _append(entry, data, etag, source):
+    if not data.startswith(entry.tail):
+        return None
+    new_data = data[len(entry.tail):]
+    if new_data and not entry.tail.endswith(b"\n") and not new_data.startswith((b"\n", b"\r\n")):
+        return None
+
+    data = entry.data
+    dropped = 0
+    if new_data.strip():
+        new_rows, dropped = _parse(new_data, names=['Time', *data.columns])
+        new_rows = new_rows[new_rows['Time'] > data.last_time()] if len(data) else new_rows
+        data = data.append(new_rows)
+
+    new = _Entry(data, etag, entry.size + len(new_data), _last_line(entry.tail + new_data), source)
+    new.lineage = entry.lineage
+    new.dropped = entry.dropped + dropped
+    if data is entry.data:
+        new.version, new._index = entry.version, entry._index
+    return new
+
+
+# 로컬 파일에서 이전에 읽은 부분 이후만 읽음
+def _incremental_local(name, entry):
+    path = _local_path(name)
+    stat = os.stat(path)
+    if stat.st_mtime_ns == entry.etag and stat.st_size == entry.size:
+        entry.checked_at = time.monotonic()
+        return entry
+    with open(path, "rb") as f:
+        f.seek(max(0, entry.size - len(entry.tail)))
+        data = f.read()
+    return _append(entry, data, stat.st_mtime_ns, "local") or _load_local(name)
+
+
+# 이전에 받은 부분 이후의 바이트만 요청해서 새 행만 덧붙임
+def _incremental_fetch(url, entry):
+    offset = entry.size - len(entry.tail)
+    headers = {"Range": f"bytes={offset}-"}
+    if entry.etag:
+        headers["If-None-Match"] = entry.etag
+    status, resp_headers, data = _request(url, headers)
+
+    if status == 304:
+        entry.checked_at = time.monotonic()
+        return entry
+    # 범위 요청을 지원하지 않으면 전체 응답이 오므로 그대로 사용
+    if status == 200:
+        return _full_entry(data, resp_headers.get("ETag"))
+    # 파일이 줄었거나 앞부분이 바뀐 경우 전체를 다시 읽음
+    if status != 206:
+        return _full_fetch(url)
+    return _append(entry, data, resp_headers.get("ETag") or entry.etag, "remote") or _full_fetch(url)
+
+
+def _refresh(name, entry, base_url):
+    if LOCAL_ONLY:
+        return _load_local(name) if entry is None else _incremental_local(name, entry)
+    url = base_url + name
+    try:
+        if entry is None or entry.source != "remote":
+            return _full_fetch(url)
+        return _incremental_fetch(url, entry)
+    except (urllib.error.URLError, OSError, ValueError):
+        # 오프라인이면 메모리의 자료를 계속 쓰고, 처음이면 로컬 사본을 읽음
+        if entry is not None:
+            entry.checked_at = time.monotonic()
+            return entry
+        return _load_local(name)
+
+
+def _lock_for(name):
+    with _locks_guard:
+        return _locks.setdefault(name, threading.Lock())
+
+
+# 열 저장소에 적힌 원본 위치에서 시작하는 빈 항목 (저장소를 만든 뒤에 붙은 바이트만 읽게 됨)
+# 원본 위치가 적혀 있지 않으면 None (원본 전체를 읽고 저장소 이후 행만 남김)
+def _seed_entry(source):
+    if not source or "size" not in source:
+        return None
+    data = CompactFrame.empty(source["columns"])
+    return _Entry(data, None, source["size"], source["tail"].encode("utf-8"), "local" if LOCAL_ONLY else "remote")
+
+
+# 저장소의 마지막 시각까지의 행을 뺀 항목
+def _trim(entry, store_end):
+    i = entry.data.search(store_end, side="right")
+    if i == 0:
+        return entry
+    new = _Entry(entry.data.since(i), entry.etag, entry.size, entry.tail, entry.source)
+    new.checked_at = entry.checked_at
+    new.lineage = entry.lineage
+    new.dropped = entry.dropped
+    return new
+
+
+# 열 저장소 사이트의 항목: 저장소를 바탕으로, 원본에서 저장소의 마지막 시각 이후에 붙은 행만 메모리에 둠
+# 저장소가 바뀌면 (ingest/precompute 를 다시 실행) 이미 저장소에 들어간 앞부분을 잘라 냄
+def _store_entry(name, manifest, entry, stale, base_url):
+    if entry is None or entry.store_version is None:
+        entry = _seed_entry(manifest.get("source"))
+        stale = True
+    if stale:
+        try:
+            entry = _refresh(name, entry, base_url)
+        except (urllib.error.URLError, OSError, ValueError):
+            # 원본이 없는 사이트 (로거 자료로만 만든 사이트 등)는 저장소만 씀
+            if entry is None:
+                entry = _Entry(CompactFrame.empty(manifest["columns"]), source="none")
+            entry.checked_at = time.monotonic()
+    version = column_store.version(site_name(name))
+    if entry.store_version != version:
+        entry = _trim(entry, column_store.time_range(manifest)[1])
+        entry.store_version = version
+    return entry
+
+
+def _cached_entry(name, ttl, base_url, force=False):
+    with _lock_for(name):
+        entry = _cache.get(name)
+        stale = entry is None or force or (not _background and time.monotonic() - entry.checked_at >= ttl)
+        manifest = column_store.read_manifest(site_name(name))
+        if manifest is not None:
+            entry = _store_entry(name, manifest, entry, stale, base_url)
+        elif entry is None or entry.store_version is not None:
+            # 저장소를 지웠으면 원본 전체를 다시 읽음
+            entry = _refresh(name, None, base_url)
+        elif stale:
+            entry = _refresh(name, entry, base_url)
+        _cache[name] = entry
+    return entry
+
+
+# TTL 과 관계없이 지금 새 자료를 확인 (백그라운드 갱신용)
+def refresh(name, base_url=BASE_URL):
+    _cached_entry(name, 0, base_url, force=True)
+
+
+def set_background(enabled):
+    global _background
+    _background = enabled
+
+
+# 지금 메모리에 올라와 있는 자료 이름 (한 번이라도 읽은 사이트만)
+def cached_names():
+    return list(_cache)
+
+
+# 'cgwt.csv' -> 'cgwt' (열 저장소의 사이트 이름)
+def site_name(name):
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+# 열 저장소 사이트의 관측정 (저장소의 열 + 원본에만 새로 생긴 열)
+def _store_columns(name, entry):
+    columns = list(column_store.read_manifest(site_name(name))["columns"])
+    return columns + [c for c in entry.data.columns if c not in columns]
+
+
+# 열 저장소의 자료에 저장소 이후의 새 행을 이어 붙인 DataFrame
+def _store_frame(name, entry, columns=None, start=None, end=None, hour=None):
+    if columns is None:
+        columns = _store_columns(name, entry)
+    df = column_store.read_site(site_name(name), columns, start, end)
+    if hour is not None:
+        df = df[df['Time'].dt.hour == hour].reset_index(drop=True)
+    if len(entry.data):
+        new = entry.time_index().select(start, end, [c for c in columns if c in entry.data.columns], hour)
+        if len(new):
+            df = pd.concat([df, new], ignore_index=True)
+    return df
+
+
+# 관측 자료를 DataFrame으로 반환 (Time은 datetime, 오름차순 정렬)
+# ingest.py 로 만든 열 저장소가 있으면 필요한 열과 달만 읽고 그 뒤에 원본의 새 행을 붙임. 없으면 캐시된 CSV를 사용
+# hour 를 주면 해당 시간대(0~23시)의 행만 반환
+# CSV 캐시는 압축 표현에서 요청한 행/열만 풀어서 DataFrame 을 만듦
+def load_csv(name, columns=None, start=None, end=None, hour=None, ttl=TTL_SECONDS, base_url=BASE_URL):
+    entry = _cached_entry(name, ttl, base_url)
+    if entry.store_version is not None:
+        return _store_frame(name, entry, columns, start, end, hour)
+    return entry.time_index().select(start, end, columns, hour)
+
+
+# 여러 관측정의 (Time 배열, (행, 관측정) 2차원 배열)
+def load_block(name, columns, start=None, end=None, hour=None, ttl=TTL_SECONDS, base_url=BASE_URL):
+    entry = _cached_entry(name, ttl, base_url)
+    if entry.store_version is not None:
+        df = _store_frame(name, entry, columns, start, end, hour)
+        return df['Time'].to_numpy(), df[list(columns)].to_numpy()
+    return entry.time_index().block(columns, start, end, hour)
+
+
+# 기간의 (평균, 최소, 최대, 개수). CSV 캐시는 누적합/희소 테이블로 자료를 훑지 않고 계산
+def range_stats(name, column, start=None, end=None, ttl=TTL_SECONDS, base_url=BASE_URL):
+    entry = _cached_entry(name, ttl, base_url)
+    if entry.store_version is not None:
+        return summarize(_store_frame(name, entry, [column], start, end)[column].to_numpy())
+    return entry.time_index().range_stats(column, start, end)
+
+
+# 열 저장소 사이트의 관측정 하나 (Time 배열, 값 배열): 요청한 열과 [start - pad, end + pad] 에 걸친 달만 읽음
+# pad 만큼 더 읽어서 기간 양 끝이 걸친 칸/구간도 전체 자료로 만든 것과 같은 값이 되게 하고,
+# 자료 기간 안에서 잘린 기간의 양 끝 시각에 빈 행을 넣어 앞뒤의 빈 칸도 전체 자료로 만든 것처럼 나오게 함
+def _store_series(name, entry, column, start, end, pad):
+    _, first, last = _describe(name, entry)
+    lo = first if start is None else min(max(first, pd.Timestamp(start)), last)
+    hi = last if end is None else max(min(last, pd.Timestamp(end)), first)
+    df = _store_frame(name, entry, [column], lo - pad, hi + pad)
+    times = np.concatenate([[np.datetime64(lo, "ns")], df['Time'].to_numpy(), [np.datetime64(hi, "ns")]])
+    values = np.concatenate([[np.nan], df[column].to_numpy(dtype=np.float64), [np.nan]])
+    order = np.argsort(times, kind="stable")
+    return times[order], values[order]
+
+
+# 일/주/월 요약 (Time, mean, min, max, count). freq 는 stats_cache.ROLLUPS 의 값
+# CSV 캐시는 관측정/구간마다 한 번 만들어 둠. 열 저장소 사이트는 요청한 관측정과 기간 근처의 달만 읽어서 만듦
+def rollup(name, column, freq, start=None, end=None, ttl=TTL_SECONDS, base_url=BASE_URL):
+    entry = _cached_entry(name, ttl, base_url)
+    if entry.store_version is None:
+        return entry.time_index().rollup(column, freq, start, end)
+    times, values = _store_series(name, entry, column, start, end, ROLLUP_PAD)
+    return rollup_range(rollup_frame(times, values, freq), start, end).reset_index(drop=True)
+
+
+# 규칙 격자 자료 (Time, mean, min, max, count, gap, interpolated). freq 는 resample.STEPS 의 키
+# CSV 캐시는 관측정/간격마다 격자를 한 번 만들어 두고 자료가 바뀔 때 다시 만듦
+# 열 저장소 사이트는 요청한 관측정과 기간에 걸친 달만 읽어서 그 기간의 격자만 만듦 (전체 자료를 메모리에 올리지 않음)
+def regular(name, column, freq, start=None, end=None, interpolate_limit=0, ttl=TTL_SECONDS, base_url=BASE_URL):
+    entry = _cached_entry(name, ttl, base_url)
+    if entry.store_version is None:
+        return entry.time_index().grid(freq, column).frame(start, end, interpolate_limit)
+    times, values = _store_series(name, entry, column, start, end, pd.Timedelta(STEPS[freq]))
+    with stage("grid_build", rows=len(times)):
+        grid = Grid(times, values, freq)
+    return grid.frame(start, end, interpolate_limit)
+
+
+def _describe(name, entry):
+    data = entry.data
+    if entry.store_version is not None:
+        _, first, last = column_store.site_info(site_name(name))
+        return _store_columns(name, entry), first, max(last, data.last_time()) if len(data) else last
+    return data.columns, data.first_time(), data.last_time()
+
+
+# 관측정 목록과 자료 기간 (열 저장소가 있으면 manifest 와 저장소 이후의 새 행만 봄)
+def describe(name, ttl=TTL_SECONDS, base_url=BASE_URL):
+    return _describe(name, _cached_entry(name, ttl, base_url))
+
+
+# 자료가 바뀔 때마다 달라지는 값 (내보내기 파일 캐시의 key 에 사용)
+def data_version(name, ttl=TTL_SECONDS, base_url=BASE_URL):
+    entry = _cached_entry(name, ttl, base_url)
+    if entry.store_version is not None:
+        return entry.store_version, entry.version
+    return entry.version
+
+
+# 새 행이 덧붙기만 하는 동안은 같은 값. 자료를 처음부터 다시 읽었거나 열 저장소가 바뀌면 달라짐
+def data_lineage(name, ttl=TTL_SECONDS, base_url=BASE_URL):
+    entry = _cached_entry(name, ttl, base_url)
+    if entry.store_version is not None:
+        return entry.store_version, entry.lineage
+    return entry.lineage
+
+
+# 원본에서 시각을 읽지 못해 뺀 행 수 (열 저장소 사이트는 저장소를 만들 때 뺀 행 포함)
+def dropped_rows(name, ttl=TTL_SECONDS, base_url=BASE_URL):
+    entry = _cached_entry(name, ttl, base_url)
+    if entry.store_version is not None:
+        manifest = column_store.read_manifest(site_name(name)) or {}
+        return manifest.get("source", {}).get("dropped", 0) + entry.dropped
+    return entry.dropped
+
+
+# 로컬 CSV 사본을 캐시 없이 읽음 (ingest 용). (DataFrame, 시각을 읽지 못해 뺀 행 수)
+def read_local(name):
+    entry = _load_local(name)
+    return entry.data.frame(), entry.dropped
+
+
+# 로컬 CSV 사본의 지금 크기, 마지막 줄, 관측정 (열 저장소에 적어 두고 그 뒤에 붙은 바이트만 이어받음)
+# 파일을 읽기 전에 불러야 그 사이에 붙은 행을 놓치지 않음 (겹친 행은 시각으로 걸러짐)
+def local_source(name):
+    with open(_local_path(name), "rb") as f:
+        header = f.readline()
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - SOURCE_TAIL_BYTES))
+        tail = _last_line(f.read())
+    columns = list(pd.read_csv(io.BytesIO(header), encoding='utf-8-sig').columns)
+    return {"file": name, "size": size, "tail": tail.decode("utf-8", "replace"),
+            "columns": [c for c in columns if c != 'Time']}
+
+
+def clear_cache():
+    _cache.clear()
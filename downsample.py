@@ -0,0 +1,117 @@
+import os
+
+import numpy as np
+
+from instrument import timed
+
+# 그래프에 보낼 점 개수: 화면 폭(px)당 최소/최대 2점
+# 그래프 폭 기본값. 큰 모니터에서 보면 GW_CHART_WIDTH_PX 로, 사이트별로는 sites.py 의 chart_width 로 바꿈
+CHART_WIDTH_PX = int(os.environ.get("GW_CHART_WIDTH_PX", 1200))
+
+
+def point_budget(width_px=CHART_WIDTH_PX):
+    return 2 * int(width_px)
+
+
+# 결측 구간의 첫 행 (그래프에서 선이 끊기는 위치를 유지하기 위함)
+def _gap_rows(y):
+    missing = np.isnan(y)
+    starts = missing.copy()
+    starts[1:] &= ~missing[:-1]
+    return np.flatnonzero(starts)
+
+
+# 구간마다 최솟값과 최댓값 행을 남김 (최고/최저 수위가 그대로 보존됨)
+def minmax_indices(y, n_out):
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    # 결측이 아닌 행만 구간으로 나눠서 점 예산을 결측 구간에 낭비하지 않음
+    valid = np.flatnonzero(~np.isnan(y))
+    m = len(valid)
+    n_buckets = max(1, n_out // 2)
+    if m <= n_out:
+        return np.unique(np.concatenate([valid, _gap_rows(y)]))
+    size = -(-m // n_buckets)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:m] = y[valid]
+    blocks = padded.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    lo = np.where(np.isnan(blocks), np.inf, blocks).argmin(axis=1) + offsets
+    hi = np.where(np.isnan(blocks), -np.inf, blocks).argmax(axis=1) + offsets
+    keep = np.concatenate([[0, m - 1], lo, hi])
+    keep = valid[keep[keep < m]]
+    return np.unique(np.concatenate([keep, _gap_rows(y)]))
+
+
+# (행, 관측정) 2차원 배열을 한 번에 처리하는 minmax_indices: 관측정별 남길 행 위치 목록을 반환
+def minmax_indices_2d(block, n_out):
+    n, m = block.shape
+    if n <= n_out:
+        return [np.arange(n)] * m
+    # 정수 배열은 결측(NaN)으로 채울 수 없으므로 실수로 바꿈 (float32 는 그대로 씀)
+    if block.dtype.kind != "f":
+        block = block.astype(np.float64)
+    n_buckets = max(1, n_out // 2)
+    size = -(-n // n_buckets)
+    padded = np.full((n_buckets * size, m), np.nan, dtype=block.dtype)
+    padded[:n] = block
+    cube = padded.reshape(n_buckets, size, m)
+    missing = np.isnan(cube)
+    offsets = (np.arange(n_buckets) * size)[:, None]
+    lo = np.where(missing, np.inf, cube).argmin(axis=1) + offsets
+    hi = np.where(missing, -np.inf, cube).argmax(axis=1) + offsets
+    filled = ~missing.all(axis=1)
+
+    # 관측정별 결측 구간의 첫 행
+    gaps = np.isnan(block)
+    gaps[1:] &= ~np.isnan(block[:-1])
+    gap_rows, gap_cols = np.nonzero(gaps)
+
+    result = []
+    for k in range(m):
+        rows = np.concatenate([lo[filled[:, k], k], hi[filled[:, k], k], gap_rows[gap_cols == k]])
+        result.append(np.unique(rows))
+    return result
+
+
+# Largest-Triangle-Three-Buckets: 모양을 가장 잘 유지하는 점을 구간마다 하나씩 고름
+def lttb_indices(x, y, n_out):
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) <= n_out:
+        return np.unique(np.concatenate([valid, _gap_rows(y)]))
+    xs = x[valid].astype(np.float64)
+    ys = y[valid].astype(np.float64)
+    m = len(valid)
+
+    edges = np.linspace(1, m - 1, n_out - 1).astype(np.int64)
+    chosen = np.empty(n_out, dtype=np.int64)
+    chosen[0], chosen[-1] = 0, m - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # 다음 구간의 평균점
+        nlo, nhi = hi, (edges[b + 2] if b + 2 < len(edges) else m)
+        cx, cy = xs[nlo:nhi].mean(), ys[nlo:nhi].mean()
+        area = np.abs((xs[a] - cx) * (ys[lo:hi] - ys[a]) - (xs[a] - xs[lo:hi]) * (cy - ys[a]))
+        a = lo + int(area.argmax())
+        chosen[b + 1] = a
+    return np.unique(np.concatenate([valid[chosen], _gap_rows(y)]))
+
+
+# 그래프용으로 줄인 DataFrame 반환 (원본 자료는 그대로 두고 다운로드 등에 사용)
+@timed("downsample")
+def downsample(df, column, max_points=None, method="minmax"):
+    max_points = point_budget() if max_points is None else max_points
+    if len(df) <= max_points:
+        return df
+    y = df[column].to_numpy(dtype=np.float64)
+    if method == "lttb":
+        x = df['Time'].to_numpy().astype(np.int64)
+        rows = lttb_indices(x, y, max_points)
+    else:
+        rows = minmax_indices(y, max_points)
+    return df.iloc[rows]
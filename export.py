@@ -0,0 +1,141 @@
+import threading
+import zlib
+from collections import OrderedDict
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from instrument import stage
+
+# 형식별 (MIME, 확장자)
+FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "csv.gz": ("application/gzip", ".csv.gz"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+CHUNK_ROWS = 50_000
+
+# 만들어 둔 파일 캐시 (최근에 쓴 것부터 남기고 전체 크기를 제한)
+# CACHE_ITEM_BYTES 보다 큰 파일은 캐시하지 않음 (전체 자료 파일 몇 개가 캐시를 다 차지하지 않도록)
+CACHE_BYTES = 64 * 1024 * 1024
+CACHE_ITEM_BYTES = 8 * 1024 * 1024
+_cache = OrderedDict()
+_cache_size = 0
+_lock = threading.Lock()
+
+
+# CSV를 CHUNK_ROWS 행씩 나눠서 bytes로 내보냄 (헤더는 첫 조각에만)
+def iter_csv(df, time_format=None, chunk_rows=CHUNK_ROWS):
+    for i in range(0, max(len(df), 1), chunk_rows):
+        part = df.iloc[i:i + chunk_rows]
+        yield part.to_csv(index=False, header=(i == 0), date_format=time_format).encode()
+
+
+def iter_gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+# ParquetWriter가 쓴 바이트를 모아 두었다가 row group 마다 꺼내 가는 출력 대상
+class _ChunkSink:
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def iter_parquet(df, chunk_rows=CHUNK_ROWS):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=chunk_rows):
+            writer.write_table(pa.Table.from_batches([batch], schema=table.schema))
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
+
+
+def iter_export(df, fmt="csv", time_format=None):
+    if fmt == "parquet":
+        return iter_parquet(df)
+    chunks = iter_csv(df, time_format)
+    return iter_gzip(chunks) if fmt == "csv.gz" else chunks
+
+
+def _remember(key, data):
+    global _cache_size
+    if len(data) > CACHE_ITEM_BYTES:
+        return
+    with _lock:
+        if key in _cache:
+            return
+        _cache[key] = data
+        _cache_size += len(data)
+        while _cache_size > CACHE_BYTES and len(_cache) > 1:
+            _, old = _cache.popitem(last=False)
+            _cache_size -= len(old)
+
+
+def cached(key, fmt):
+    with _lock:
+        data = _cache.get((key, fmt))
+        if data is not None:
+            _cache.move_to_end((key, fmt))
+        return data
+
+
+# (사이트, 위치, 기간, 자료 버전) 같은 key 로 만든 파일을 캐시해서 반환
+# make_frame 은 캐시에 없을 때만 호출됨
+# 조각들을 모아 파일 전체를 bytes 로 만듦 (st.download_button 은 bytes 를 받아야 함)
+# 큰 파일은 조각마다 바로 보내는 api.py 의 /sites/{site}/export 로 받는 것이 좋음
+def export_bytes(key, make_frame, fmt="csv", time_format=None):
+    return cached_bytes(key, fmt, lambda: b"".join(iter_export(make_frame(), fmt, time_format)))
+
+
+# 캐시에 없을 때만 make_bytes() 로 만들어 넣음 (api.py 의 응답 본문도 같은 캐시를 씀)
+def cached_bytes(key, fmt, make_bytes):
+    data = cached(key, fmt)
+    if data is None:
+        with stage(f"export_{fmt}") as s:
+            data = make_bytes()
+            s.add(nbytes=len(data))
+        _remember((key, fmt), data)
+    return data
+
+
+# Streamlit 다운로드 버튼: 누르기 전에는 파일을 만들지 않고, 만든 파일은 캐시에서 재사용
+# 만든 파일은 세션이 버튼을 그리는 동안 메모리에 남음 (CACHE_ITEM_BYTES 보다 크면 캐시에는 넣지 않음)
+def download_button(label, key, make_frame, fmt="csv", file_name="data", time_format=None):
+    import streamlit as st
+
+    mime, ext = FORMATS[fmt]
+    data = cached(key, fmt)
+    if data is None and st.button(f"{label} 준비", key=f"prepare-{label}"):
+        with st.spinner("파일을 만드는 중입니다..."):
+            data = export_bytes(key, make_frame, fmt, time_format)
+    if data is not None:
+        st.download_button(label, data, file_name=file_name + ext, mime=mime, key=f"download-{label}")
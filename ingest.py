@@ -0,0 +1,24 @@
+import sys
+
+import column_store
+from data_loader import local_source, read_local, site_name
+
+# 사이트 CSV를 월별 열 저장소(store/)로 변환
+# 사용법: python ingest.py [cgwt.csv cgwt_bd.csv ...]
+DEFAULT_FILES = ["cgwt.csv", "cgwt_bd.csv", "cgwt_nnhn.csv"]
+
+
+# 저장소에 원본 위치를 함께 적어 두어, 앱은 그 뒤에 원본에 붙은 행만 이어서 읽음
+def ingest_csv(name, store_dir=column_store.STORE_DIR):
+    source = local_source(name)
+    df, source["dropped"] = read_local(name)
+    manifest = column_store.write_site(site_name(name), df, store_dir, source=source)
+    return len(df), len(manifest["partitions"]), source["dropped"]
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or DEFAULT_FILES:
+        rows, months, dropped = ingest_csv(name)
+        print(f"{name}: {rows}행, {months}개월 -> {column_store.STORE_DIR}")
+        if dropped:
+            print(f"  경고: 시각을 읽지 못한 {dropped}행은 제외함")
@@ -0,0 +1,186 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 단계별 시간/행 수/바이트 수 측정
+#   with stage("parse") as s:
+#       ...
+#       s.add(rows=len(df), nbytes=len(data))
+#   @timed("downsample")
+# 꺼져 있으면 stage() 는 아무것도 하지 않는 객체 하나를 돌려주고, timed 는 원래 함수를 바로 부름
+#
+# 아래 환경 변수 중 하나라도 있으면 측정을 켜고 프로세스 전체 누적값을 모음
+#   GW_TRACE=1               누적값만 모음 (metrics_text(), Prometheus 형식)
+#   GW_TRACE_LOG=<파일>      화면을 다시 그릴 때마다 단계별 기록을 JSON 한 줄로 덧붙임
+#   GW_METRICS_PORT=<포트>   Streamlit 앱 프로세스의 누적값을 http://<호스트>:<포트>/metrics 로 내보냄
+#                            (기본은 127.0.0.1 에서만 받음. 다른 서버에서 수집하면 GW_METRICS_HOST=0.0.0.0)
+# api.py 는 같은 누적값을 자기 /metrics 로 내보냄 (앱과 API 는 따로 실행하면 서로 다른 프로세스의 값)
+# 화면의 성능 정보 패널은 켠 세션의 실행만 기록함 (begin_run/end_run)
+LOG_PATH = os.environ.get("GW_TRACE_LOG")
+METRICS_PORT = os.environ.get("GW_METRICS_PORT")
+METRICS_HOST = os.environ.get("GW_METRICS_HOST", "127.0.0.1")
+_enabled = os.environ.get("GW_TRACE") == "1" or bool(LOG_PATH) or bool(METRICS_PORT)
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_totals = {}        # 단계 -> [호출 수, 초, 최대 초, 행 수, 바이트 수]
+_lock = threading.Lock()
+
+
+class _Noop:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, rows=0, nbytes=0):
+        pass
+
+
+_NOOP = _Noop()
+
+
+class _Span:
+    __slots__ = ("name", "rows", "nbytes", "start", "run")
+
+    def __init__(self, name, rows, nbytes, run):
+        self.name = name
+        self.rows = rows
+        self.nbytes = nbytes
+        self.run = run
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        if self.run is not None:
+            self.run.append({"stage": self.name, "ms": seconds * 1000, "rows": self.rows, "bytes": self.nbytes})
+        if _enabled:
+            with _lock:
+                total = _totals.setdefault(self.name, [0, 0.0, 0.0, 0, 0])
+                total[0] += 1
+                total[1] += seconds
+                total[2] = max(total[2], seconds)
+                total[3] += self.rows
+                total[4] += self.nbytes
+        return False
+
+    def add(self, rows=0, nbytes=0):
+        self.rows += rows
+        self.nbytes += nbytes
+
+
+def stage(name, rows=0, nbytes=0):
+    run = getattr(_local, "run", None)
+    if run is None and not _enabled:
+        return _NOOP
+    return _Span(name, rows, nbytes, run)
+
+
+def timed(name):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled and getattr(_local, "run", None) is None:
+                return fn(*args, **kwargs)
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def enabled():
+    return _enabled
+
+
+# 이 스레드(Streamlit 세션의 실행)에서 일어나는 단계를 기록하기 시작
+def begin_run():
+    _local.run = []
+    _local.run_start = time.perf_counter()
+
+
+# 기록을 끝내고 단계별 기록 목록을 반환 (로그 파일이 있으면 한 줄 덧붙임)
+def end_run(**info):
+    run = getattr(_local, "run", None)
+    _local.run = None
+    if run is None:
+        return []
+    total_ms = (time.perf_counter() - _local.run_start) * 1000
+    if LOG_PATH:
+        line = json.dumps({"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "total_ms": total_ms, **info, "stages": run},
+                          ensure_ascii=False, default=str)
+        with _lock, open(LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    run.append({"stage": "total", "ms": total_ms, "rows": 0, "bytes": 0})
+    return run
+
+
+# 프로세스 누적값 (Prometheus 텍스트 형식)
+def metrics_text():
+    with _lock:
+        totals = {name: list(values) for name, values in _totals.items()}
+    lines = []
+    metrics = [
+        ("gw_stage_calls_total", "counter", "단계 호출 수", 0),
+        ("gw_stage_seconds_total", "counter", "단계에 쓴 시간 (초)", 1),
+        ("gw_stage_seconds_max", "gauge", "단계 한 번의 최대 시간 (초)", 2),
+        ("gw_stage_rows_total", "counter", "단계가 처리한 행 수", 3),
+        ("gw_stage_bytes_total", "counter", "단계가 읽거나 만든 바이트 수", 4),
+    ]
+    for metric, kind, help_text, k in metrics:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, values in sorted(totals.items()):
+            lines.append(f'{metric}{{stage="{name}"}} {values[k]}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.partition("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics_text().encode()
+        self.send_response(200)
+        self.send_header("content-type", "text/plain; version=0.0.4")
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_metrics_server = None
+
+
+# GW_METRICS_PORT 가 있으면 /metrics 만 응답하는 서버를 백그라운드 스레드로 띄움 (이미 떠 있으면 그대로)
+# Streamlit 은 실행마다 app.main 을 부르므로 프로세스에서 처음 한 번만 띄움
+def serve_metrics(port=METRICS_PORT, host=METRICS_HOST):
+    global _metrics_server
+    if not port:
+        return None
+    with _lock:
+        if _metrics_server is None:
+            try:
+                _metrics_server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            except OSError as e:
+                logger.warning("/metrics 서버를 띄우지 못했습니다 (포트 %s): %s", port, e)
+                _metrics_server = False
+                return None
+            threading.Thread(target=_metrics_server.serve_forever, name="gw-metrics", daemon=True).start()
+    return _metrics_server or None
+
+
+def reset():
+    with _lock:
+        _totals.clear()
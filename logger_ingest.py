@@ -0,0 +1,79 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+import column_store
+
+# 로거 원시 출력 (output.csv) 형식
+#   지역,ID,시간,수압
+#   양평지암,00002,시간 : 23/12/03 19:50:14,수압: 0021
+TIME_FORMAT = "시간 : %y/%m/%d %H:%M:%S"
+PRESSURE_PREFIX = "수압:"
+CHUNK_ROWS = 200_000
+
+# 대시보드와 같은 1시간 간격으로 맞춤
+FREQ = "h"
+
+
+# 한 조각의 원시 행을 (지역, ID, Time, 수압) 으로 변환
+# 접두어가 붙은 채로 형식 문자열/문자열 연산을 한 번에 적용하므로 행 단위 반복이 없음
+def parse_chunk(raw):
+    time = pd.to_datetime(raw['시간'].str.strip(), format=TIME_FORMAT, errors='coerce')
+    pressure = raw['수압'].str.strip()
+    has_prefix = pressure.str.startswith(PRESSURE_PREFIX)
+    pressure = pd.to_numeric(pressure.str.slice(len(PRESSURE_PREFIX)).where(has_prefix), errors='coerce')
+    df = pd.DataFrame({
+        '지역': raw['지역'].str.strip(),
+        'ID': raw['ID'].str.strip(),
+        'Time': time,
+        '수압': pressure.astype(np.float32),
+    })
+    return df.dropna(subset=['Time', '수압'])
+
+
+# 큰 로그 파일도 CHUNK_ROWS 행씩 읽어서 메모리 사용량을 일정하게 유지
+def read_logger(path, chunk_rows=CHUNK_ROWS):
+    reader = pd.read_csv(path, dtype=str, encoding='utf-8-sig', chunksize=chunk_rows,
+                         skipinitialspace=True, on_bad_lines='skip')
+    for raw in reader:
+        yield parse_chunk(raw)
+
+
+# 로거 (약 20분 간격) 값을 1시간 평균으로 모음
+# 조각마다 (지역, ID, 시간) 별 합계와 개수만 남기므로 여러 조각에 걸친 시간도 정확히 평균됨
+def hourly(path, chunk_rows=CHUNK_ROWS, freq=FREQ):
+    partials = []
+    for df in read_logger(path, chunk_rows):
+        df['Time'] = df['Time'].dt.floor(freq)
+        partials.append(df.groupby(['지역', 'ID', 'Time'])['수압'].agg(['sum', 'count']))
+    if not partials:
+        return {}
+    totals = pd.concat(partials).groupby(level=[0, 1, 2]).sum()
+    mean = (totals['sum'] / totals['count']).astype(np.float32)
+
+    # 지역(사이트)별로 Time + ID 열 형태로 펼침
+    sites = {}
+    for region, part in mean.groupby(level=0):
+        wide = part.droplevel(0).unstack('ID').sort_index()
+        wide.columns = [str(c) for c in wide.columns]
+        sites[region] = wide.rename_axis('Time').reset_index()
+    return sites
+
+
+# 로거 파일을 사이트 열 저장소에 추가 (같은 시간은 새 값으로 덮어씀)
+# 새 지역은 store/<지역>/ 에 만들어지고, sites.py 가 자동으로 사이트 목록에 넣음 (자료 파일 이름 <지역>.csv)
+def ingest_logger(path, site=None, store_dir=column_store.STORE_DIR, chunk_rows=CHUNK_ROWS):
+    result = {}
+    for region, df in hourly(path, chunk_rows).items():
+        name = site or region
+        column_store.write_site(name, df, store_dir)
+        result[name] = len(df)
+    return result
+
+
+if __name__ == "__main__":
+    # 사용법: python logger_ingest.py output.csv [...]
+    for path in sys.argv[1:] or ["output.csv"]:
+        for name, rows in ingest_logger(path).items():
+            print(f"{path}: {name} {rows}시간 -> {column_store.STORE_DIR}")
@@ -0,0 +1,46 @@
+import math
+
+import pandas as pd
+
+from downsample import CHART_WIDTH_PX, minmax_indices_2d, point_budget
+
+# 나눠 보기에서 한 줄에 놓을 그래프 수
+GRID_COLUMNS = 3
+GRID_ROW_HEIGHT_PX = 220
+
+# plotly 는 import 에 수백 ms 가 걸리므로 그래프를 처음 그릴 때 불러옴
+
+
+# 여러 관측정을 WebGL(scattergl) 그래프 하나로 그림
+# 기간 조회와 점 줄이기는 (행, 관측정) 2차원 배열에 한 번만 수행
+def overlay_figure(times, block, columns, title, max_points=None):
+    import plotly.graph_objects as go
+
+    max_points = point_budget() if max_points is None else max_points
+    fig = go.Figure()
+    for k, rows in enumerate(minmax_indices_2d(block, max_points)):
+        fig.add_trace(go.Scattergl(x=times[rows], y=block[rows, k], mode="lines", name=columns[k]))
+    fig.update_layout(title=title, xaxis_title="Time", yaxis_title="지하수위", hovermode="x unified")
+    return fig
+
+
+# 관측정마다 작은 그래프를 격자로 배치 (x 축 공유, 하나의 그림)
+def grid_figure(times, block, columns, title, n_cols=GRID_COLUMNS, width_px=CHART_WIDTH_PX):
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    n_cols = max(1, min(n_cols, len(columns)))
+    n_rows = math.ceil(len(columns) / n_cols)
+    fig = make_subplots(rows=n_rows, cols=n_cols, shared_xaxes=True, subplot_titles=columns,
+                        vertical_spacing=min(0.08, 0.3 / n_rows))
+    max_points = point_budget(width_px // n_cols)
+    for k, rows in enumerate(minmax_indices_2d(block, max_points)):
+        fig.add_trace(go.Scattergl(x=times[rows], y=block[rows, k], mode="lines", name=columns[k], showlegend=False),
+                      row=k // n_cols + 1, col=k % n_cols + 1)
+    fig.update_layout(title=title, height=GRID_ROW_HEIGHT_PX * n_rows + 80)
+    return fig
+
+
+# 다운로드용 DataFrame (Time + 선택한 관측정)
+def block_frame(times, block, columns):
+    return pd.DataFrame({'Time': times, **{c: block[:, k] for k, c in enumerate(columns)}})
@@ -0,0 +1,159 @@
+import argparse
+import hashlib
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+import column_store
+import data_loader
+from data_loader import read_local, site_name
+from ingest import DEFAULT_FILES
+
+# 여러 사이트 CSV를 프로세스 여러 개로 나눠서 월별 열 저장소(store/)로 한꺼번에 다시 만듦
+# 사용법: python precompute.py [cgwt.csv cgwt_bd.csv ...] [--jobs N] [--force]
+#
+# 1. 사이트마다: 원본 파일 해시가 manifest 에 적힌 것과 같으면 읽지도 않고 건너뜀
+#    다르면 읽어서 달별로 나누고, 달마다 내용 해시가 같은 달은 기존 파티션을 그대로 씀
+# 2. 바뀐 달마다: 파티션 파일을 <YYYY-MM>.<해시>.parquet 로 씀 (기존 파일은 건드리지 않음)
+# 3. 사이트의 모든 달이 끝나면 manifest 를 한 번에 바꾸고 쓰지 않게 된 파일을 지움
+# 사이트 읽기와 달 쓰기를 같은 프로세스 풀에 넣으므로 사이트가 적어도 달 단위로 코어를 나눠 씀
+HASH_CHUNK = 1 << 20
+# 파티션 파일 이름에 붙일 해시 길이
+FILE_HASH_CHARS = 12
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# 파티션에 실제로 저장되는 값 (epoch 초, float32 수위)의 해시
+def month_hash(part, columns):
+    digest = hashlib.sha256("\t".join(columns).encode())
+    digest.update(part['Time'].values.astype("datetime64[s]").astype(np.int64).tobytes())
+    digest.update(np.ascontiguousarray(part[columns].to_numpy(dtype=np.float32)).tobytes())
+    return digest.hexdigest()
+
+
+# 사이트 하나를 읽고 달별로 나눔 (프로세스 풀에서 실행)
+# 원본이 그대로면 months 는 None. 내용이 그대로인 달은 (해시, None)
+def prepare_site(name, store_dir=column_store.STORE_DIR, force=False):
+    site = site_name(name)
+    digest = file_hash(os.path.join(data_loader.LOCAL_DIR, name))
+    manifest = column_store.read_manifest(site, store_dir)
+    if not force and manifest and manifest.get("source", {}).get("sha256") == digest:
+        return {"site": site, "sha256": digest, "rows": None, "months": None}
+
+    source = data_loader.local_source(name)
+    df, source["dropped"] = read_local(name)
+    columns = [c for c in df.columns if c != 'Time']
+    # 관측정 구성이 바뀌면 모든 달을 다시 씀
+    old = manifest["partitions"] if manifest and manifest["columns"] == columns and not force else {}
+    months = {}
+    for month, part in column_store.split_months(df):
+        part = part.drop_duplicates(subset='Time', keep='last').reset_index(drop=True)
+        h = month_hash(part, columns)
+        months[month] = (h, None if old.get(month, {}).get("hash") == h else part)
+    return {"site": site, "sha256": digest, "rows": len(df), "columns": columns, "months": months,
+            "partitions": old, "source": source}
+
+
+# 달 하나의 파티션을 씀 (프로세스 풀에서 실행)
+def write_month(site, month, part, columns, h, store_dir=column_store.STORE_DIR):
+    file = f"{month}.{h[:FILE_HASH_CHARS]}.parquet"
+    entry = column_store.write_partition(site, month, part, columns, store_dir, file=file)
+    entry["hash"] = h
+    return entry
+
+
+# 사이트별 결과 {사이트: {"rows", "dropped", "written", "skipped", "seconds"} 또는 {"error"}}
+def precompute(names=None, jobs=None, store_dir=column_store.STORE_DIR, force=False):
+    names = list(names or DEFAULT_FILES)
+    started = time.perf_counter()
+    results = {}
+    pending = {}        # 사이트 -> 아직 끝나지 않은 달 수
+    manifests = {}      # 사이트 -> 새 manifest
+    futures = {}        # future -> ("site", 파일 이름) 또는 ("month", (사이트, 달))
+
+    def finish(site):
+        manifest = manifests.pop(site)
+        manifest["partitions"] = dict(sorted(manifest["partitions"].items()))
+        column_store.replace_site(site, manifest, store_dir)
+        results[site]["seconds"] = time.perf_counter() - started
+
+    def site_done(pool, name, prepared):
+        site = prepared["site"]
+        months = prepared["months"]
+        if months is None:
+            results[site] = {"rows": None, "dropped": 0, "written": 0, "skipped": "all",
+                             "seconds": time.perf_counter() - started}
+            return
+        changed = {m: (h, part) for m, (h, part) in months.items() if part is not None}
+        manifests[site] = {
+            "columns": prepared["columns"],
+            "partitions": {m: prepared["partitions"][m] for m in months if m not in changed},
+            "source": {**prepared["source"], "sha256": prepared["sha256"]},
+        }
+        results[site] = {"rows": prepared["rows"], "dropped": prepared["source"]["dropped"],
+                         "written": len(changed), "skipped": len(months) - len(changed)}
+        pending[site] = len(changed)
+        for month, (h, part) in changed.items():
+            future = pool.submit(write_month, site, month, part, prepared["columns"], h, store_dir)
+            futures[future] = ("month", (site, month))
+        if not changed:
+            finish(site)
+
+    def month_done(site, month, entry):
+        manifests[site]["partitions"][month] = entry
+        pending[site] -= 1
+        if pending[site] == 0:
+            finish(site)
+
+    with ProcessPoolExecutor(jobs) as pool:
+        for name in names:
+            futures[pool.submit(prepare_site, name, store_dir, force)] = ("site", name)
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, key = futures.pop(future)
+                site = site_name(key) if kind == "site" else key[0]
+                # 앞서 같은 사이트의 다른 달이 실패했으면 나머지 결과는 버림
+                if kind == "month" and site not in manifests:
+                    continue
+                try:
+                    if kind == "site":
+                        site_done(pool, key, future.result())
+                    else:
+                        month_done(site, key[1], future.result())
+                except Exception as e:
+                    # 실패한 사이트는 manifest 를 바꾸지 않으므로 기존 자료가 그대로 남음
+                    manifests.pop(site, None)
+                    results[site] = {"error": repr(e) if kind == "site" else f"{key[1]}: {e!r}"}
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="사이트 CSV -> 월별 열 저장소 일괄 변환 (병렬)")
+    parser.add_argument("files", nargs="*", help=f"CSV 파일 (기본: {' '.join(DEFAULT_FILES)})")
+    parser.add_argument("--jobs", type=int, default=None, help="프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--store", default=column_store.STORE_DIR, help="저장소 위치")
+    parser.add_argument("--force", action="store_true", help="해시가 같아도 모두 다시 씀")
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    for site, result in precompute(args.files, args.jobs, args.store, args.force).items():
+        if "error" in result:
+            print(f"{site}: 실패 {result['error']}")
+        elif result["skipped"] == "all":
+            print(f"{site}: 변경 없음")
+        else:
+            print(f"{site}: {result['rows']}행, {result['written']}개월 씀, {result['skipped']}개월 그대로 "
+                  f"({result['seconds']:.2f}s)")
+            if result["dropped"]:
+                print(f"  경고: 시각을 읽지 못한 {result['dropped']}행은 제외함")
+    print(f"-> {args.store} ({time.perf_counter() - t:.2f}s)")
@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+
+import anomaly
+import column_store
+import data_loader
+
+# 새 자료 확인 간격(초). 로컬 파일과 열 저장소는 watchdog 이 있으면 바뀌는 즉시 확인
+POLL_SECONDS = 60
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+
+# 모든 사용자 세션이 함께 쓰는 백그라운드 갱신 스레드
+# 메모리에 올라온 사이트만 주기적으로 확인하고, 자료가 바뀌면 버전을 올려 기다리는 세션을 깨움
+# 사용자가 N 명이어도 원본 확인은 한 번만 일어남
+class Refresher(threading.Thread):
+    def __init__(self, interval=POLL_SECONDS):
+        super().__init__(name="gw-refresher", daemon=True)
+        self.interval = interval
+        self.changed = threading.Condition()
+        self._wake = threading.Event()
+        self._halt = threading.Event()
+        self._observer = None
+
+    def run(self):
+        self._watch_local_files()
+        while not self._halt.is_set():
+            self.poll()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+        if self._observer is not None:
+            self._observer.stop()
+
+    def poll(self):
+        changed = False
+        for name in data_loader.cached_names():
+            before = data_loader.data_version(name)
+            try:
+                data_loader.refresh(name)
+            except Exception:
+                # 한 사이트의 오류로 다른 사이트 갱신이 멈추지 않도록 함 (다음 주기에 다시 시도)
+                continue
+            if data_loader.data_version(name) != before:
+                # 새로 붙은 행만 이상 자료 점검
+                anomaly.update(name)
+                changed = True
+        if changed:
+            with self.changed:
+                self.changed.notify_all()
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        self._halt.set()
+        self._wake.set()
+
+    # versions(이름 -> 버전)와 다른 버전이 생길 때까지 최대 timeout 초 기다림
+    def wait_for_change(self, versions, timeout):
+        with self.changed:
+            if _current(versions) != versions:
+                return True
+            self.changed.wait(timeout)
+        return _current(versions) != versions
+
+    # 로컬 CSV 폴더와 열 저장소를 감시해서 CSV 나 manifest 가 바뀌면 바로 확인
+    # 원격 자료를 쓸 때도 저장소는 로컬에서 다시 만들어지므로 항상 감시함
+    # 파일을 새로 만들거나 임시 파일을 교체(os.replace)하는 경우도 있으므로 수정 이벤트만 보지 않음
+    def _watch_local_files(self):
+        if Observer is None:
+            return
+        refresher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory or event.event_type not in ("created", "modified", "moved"):
+                    return
+                paths = (event.src_path, getattr(event, "dest_path", "") or "")
+                if any(p.endswith(".csv") or os.path.basename(p) == column_store.MANIFEST for p in paths):
+                    refresher.wake()
+
+        self._observer = Observer()
+        if data_loader.LOCAL_ONLY:
+            self._observer.schedule(Handler(), data_loader.LOCAL_DIR, recursive=False)
+        if os.path.isdir(column_store.STORE_DIR):
+            self._observer.schedule(Handler(), column_store.STORE_DIR, recursive=True)
+        self._observer.daemon = True
+        self._observer.start()
+
+
+def _current(versions):
+    return {name: data_loader.data_version(name) for name in versions}
+
+
+_refresher = None
+_lock = threading.Lock()
+
+
+# 프로세스에 하나만 있는 갱신 스레드를 시작 (이미 있으면 그대로 반환)
+def start(interval=POLL_SECONDS):
+    global _refresher
+    with _lock:
+        if _refresher is None or not _refresher.is_alive():
+            data_loader.set_background(True)
+            _refresher = Refresher(interval)
+            _refresher.start()
+        return _refresher
+
+
+def stop():
+    global _refresher
+    with _lock:
+        if _refresher is not None:
+            _refresher.stop()
+            _refresher.join()
+            _refresher = None
+        data_loader.set_background(False)
+
+
+# Streamlit 세션에서 호출: 보고 있는 자료의 버전이 바뀔 때만 화면을 다시 그림
+# 기다리는 동안 placeholder 를 갱신해서 사용자가 위젯을 바꾸면 바로 멈추고 다시 실행되도록 함
+def follow(names, placeholder, check_seconds=2):
+    import streamlit as st
+
+    refresher = start()
+    versions = _current(names)
+    while True:
+        placeholder.caption(f"자동 갱신 중 · 마지막 확인 {time.strftime('%H:%M:%S')}")
+        if refresher.wait_for_change(versions, check_seconds):
+            st.rerun()
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+# 규칙 격자 간격 (가는 것부터). 그래프는 기간에 맞는 가장 고운 격자를 고름
+STEPS = {"h": np.timedelta64(1, "h"), "D": np.timedelta64(1, "D")}
+STEP_LABELS = {"h": "1시간", "D": "1일"}
+
+# 보간할 결측 구간의 최대 길이 (격자 칸 수). 더 긴 구간은 비워 둠
+INTERPOLATE_LIMIT = 3
+
+
+# 불규칙한 관측 시간을 고정 간격 격자로 맞춘 관측정 하나의 자료
+# 칸마다 평균/최소/최대(float64)/개수를 두고, 값이 없는 칸은 NaN 과 count 0 으로 결측을 명시함
+# 칸 시각은 따로 들지 않고 기준 시각 + 칸 번호 * 간격으로 계산 (frame 이 bounds 로 고른 칸만 만듦)
+class Grid:
+    def __init__(self, times, values, freq):
+        self.freq = freq
+        self.step = STEPS[freq]
+        if len(times) == 0:
+            self.origin = np.datetime64("1970-01-01", "ns")
+            self.mean = self.min = self.max = np.empty(0)
+            self.count = np.empty(0, dtype=np.uint16)
+            return
+
+        # 칸 번호 (자료가 시간순이므로 같은 칸의 행은 붙어 있음)
+        self.origin = times[0].astype("datetime64[D]").astype(times.dtype)
+        bins = ((times - self.origin) // self.step).astype(np.int64)
+        n_bins = int(bins[-1]) + 1
+        starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+        filled = bins[starts]
+
+        values = np.asarray(values, dtype=np.float64)
+        valid = ~np.isnan(values)
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        counts = np.add.reduceat(valid, starts, dtype=np.int64)
+
+        # 한 칸의 관측 수는 하루 몇 백 개를 넘지 않으므로 uint16 으로 충분 (넘으면 더 큰 형)
+        self.count = np.zeros(n_bins, dtype=np.uint16 if counts.max() <= np.iinfo(np.uint16).max else np.int64)
+        self.count[filled] = counts
+        # 칸 수만큼만 들므로 float64 로 둠 (float32 로 줄이면 -13.71 이 -13.7100000381 로 나감)
+        self.mean = np.full(n_bins, np.nan)
+        self.min = np.full(n_bins, np.nan)
+        self.max = np.full(n_bins, np.nan)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.mean[filled] = np.where(counts > 0, sums / counts, np.nan)
+        # fmin/fmax 는 NaN 을 건너뜀
+        self.min[filled] = np.fmin.reduceat(values, starts)
+        self.max[filled] = np.fmax.reduceat(values, starts)
+
+    def __len__(self):
+        return len(self.mean)
+
+    # 시각 t 가 들어 있는 칸 번호 (앞은 -1, 뒤는 len 까지로 자름)
+    def _bin(self, t):
+        offset = (np.datetime64(pd.Timestamp(t), "ns") - self.origin) // self.step
+        return int(min(max(offset, -1), len(self)))
+
+    # [start, end] 에 걸친 칸 범위 (start 가 들어 있는 칸부터)
+    def bounds(self, start=None, end=None):
+        i = 0 if start is None else max(0, self._bin(start))
+        j = len(self) if end is None else min(len(self), self._bin(end) + 1)
+        return int(i), int(max(i, j))
+
+    # 격자 자료 (Time, mean, min, max, count, gap, interpolated)
+    # interpolate_limit 칸 이하의 결측은 선형 보간하고 interpolated 로 표시 (gap 은 원래 결측 그대로)
+    def frame(self, start=None, end=None, interpolate_limit=0):
+        i, j = self.bounds(start, end)
+        mean = self.mean[i:j].astype(np.float64)
+        gap = self.count[i:j] == 0
+        filled = interpolate(mean, interpolate_limit) if interpolate_limit else mean
+        return pd.DataFrame({
+            'Time': self.origin + np.arange(i, j) * self.step,
+            'mean': filled,
+            'min': self.min[i:j].astype(np.float64),
+            'max': self.max[i:j].astype(np.float64),
+            'count': self.count[i:j].astype(np.int32),
+            'gap': gap,
+            'interpolated': gap & ~np.isnan(filled),
+        }, copy=False)
+
+
+# 길이가 limit 칸 이하인 안쪽 결측만 앞뒤 값으로 선형 보간
+def interpolate(values, limit):
+    values = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(values)
+    if not missing.any() or missing.all():
+        return values
+    n = len(values)
+    idx = np.arange(n)
+    prev = np.maximum.accumulate(np.where(missing, -1, idx))
+    next_ = np.minimum.accumulate(np.where(missing, n, idx)[::-1])[::-1]
+    fill = missing & (prev >= 0) & (next_ < n) & (next_ - prev - 1 <= limit)
+    out = values.copy()
+    p, q = prev[fill], next_[fill]
+    out[fill] = values[p] + (values[q] - values[p]) * (idx[fill] - p) / (q - p)
+    return out
+
+
+# 기간을 max_points 칸 안에 담을 수 있는 가장 고운 격자 (모두 넘치면 가장 성긴 격자)
+def pick_freq(start, end, max_points):
+    span = np.datetime64(pd.Timestamp(end)) - np.datetime64(pd.Timestamp(start))
+    for freq, step in STEPS.items():
+        if span // step + 1 <= max_points:
+            return freq
+    return freq
@@ -0,0 +1,18 @@
+import sys
+
+import instrument
+import warmup
+
+# 캐시를 미리 채우면서 Streamlit 서버를 띄움 (streamlit run app.py 대신 사용)
+# 미리 읽기는 서버와 같은 프로세스의 백그라운드 스레드에서 하므로 화면이 같은 캐시를 씀
+# 사용법: python serve.py [streamlit run 옵션 ...]
+# GW_METRICS_PORT=<포트> 를 주면 미리 읽기부터 단계별 누적 시간을 http://<호스트>:<포트>/metrics 로 내보냄
+APP = "app.py"
+
+if __name__ == "__main__":
+    from streamlit.web import cli
+
+    instrument.serve_metrics()
+    warmup.prewarm_in_background()
+    sys.argv = ["streamlit", "run", APP, *sys.argv[1:]]
+    sys.exit(cli.main())
@@ -0,0 +1,59 @@
+import os
+
+import column_store
+
+# 사이트 목록: 이름 -> 자료 파일, 이미지, 화면 기본값
+# 새 사이트는 여기에 한 줄 추가하면 app.py 에 나타남 (자료는 처음 선택할 때 읽음)
+# logger_ingest.py 로 만든 사이트처럼 열 저장소(store/<사이트>/)에만 있는 사이트는 자동으로 목록에 들어감
+# (자료 파일 이름은 <사이트>.csv, 이미지 없음). 이미지나 화면 기본값을 바꾸려면 여기에 같은 형식으로 적음
+DEFAULTS = {
+    "dlt_nm": 3,            # 처음 화면에 보여줄 기간 (일)
+    "hour": 24,             # 선택하는 시간 기본값 (24는 전체 시간)
+    "rng_cmn": 5,           # y 축 범위 크기 기본값
+    "time_format": "%Y-%m-%d %H:%M",  # 다운로드 CSV 의 시간 형식
+    "chart_width": None,    # 그래프 폭 (px, 점 줄이기 기준). None 이면 GW_CHART_WIDTH_PX (기본 1200)
+    "tz": "Asia/Seoul",     # 자료의 시각이 기록된 시간대 (CSV 에는 시간대 없이 현지 시각으로 적혀 있음)
+}
+
+SITES = {
+    "cgwt": {
+        "csv": "cgwt.csv",
+        "image": "https://raw.githubusercontent.com/cgwatertech/GW_mnt/main/desKTOP_IMG.png",
+        "dlt_nm": 7,
+        "time_format": None,
+    },
+    "yujin_bd": {
+        "csv": "cgwt_bd.csv",
+        "image": "https://raw.githubusercontent.com/cgwatertech/gwmonitoring/main/Yujin_bd.png",
+    },
+    "yujin_nonhyun": {
+        "csv": "cgwt_nnhn.csv",
+        "image": "https://raw.githubusercontent.com/cgwatertech/GW_mnt/main/Yujin_nonhyun.png",
+    },
+}
+
+
+# 열 저장소에는 있지만 SITES 의 어느 자료 파일에도 해당하지 않는 사이트를 등록
+def _register_store_sites(store_dir=column_store.STORE_DIR):
+    if not os.path.isdir(store_dir):
+        return
+    known = {os.path.splitext(site["csv"])[0] for site in SITES.values()}
+    for site in sorted(os.listdir(store_dir)):
+        if site not in known and site not in SITES and column_store.has_site(site, store_dir):
+            register(site, f"{site}.csv")
+
+
+def site_names():
+    _register_store_sites()
+    return list(SITES)
+
+
+# 기본값을 채운 사이트 설정
+def get_site(name):
+    if name not in SITES:
+        _register_store_sites()
+    return {**DEFAULTS, "name": name, **SITES[name]}
+
+
+def register(name, csv, image=None, **options):
+    SITES[name] = {"csv": csv, "image": image, **options}
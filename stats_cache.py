@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+# 최솟값/최댓값 희소 테이블을 만들 블록 크기 (행)
+BLOCK = 64
+
+# 그래프 자료 종류 -> resample 간격
+ROLLUPS = {"일평균": "D", "주평균": "W-MON", "월평균": "MS"}
+
+
+# 희소 테이블: table[k][b] = 블록 b 부터 2^k 개 블록의 최솟값(최댓값)
+def _sparse_table(base, op):
+    table = [base]
+    k = 1
+    while (1 << k) <= len(base):
+        prev = table[-1]
+        half = 1 << (k - 1)
+        table.append(op(prev[:-half], prev[half:]))
+        k += 1
+    return table
+
+
+# 블록별 (합, 개수, 최소, 최대). 빈 블록의 최소/최대는 inf/-inf
+def _blocks(values):
+    n_blocks = -(-len(values) // BLOCK)
+    padded = np.full(n_blocks * BLOCK, np.nan)
+    padded[:len(values)] = values
+    padded = padded.reshape(n_blocks, BLOCK)
+    valid = ~np.isnan(padded)
+    sums = np.where(valid, padded, 0.0).sum(axis=1)
+    counts = valid.sum(axis=1)
+    lo = np.where(valid, padded, np.inf).min(axis=1)
+    hi = np.where(valid, padded, -np.inf).max(axis=1)
+    return sums, counts, lo, hi
+
+
+# 관측정 한 열의 기간 통계 (평균/최소/최대/개수)
+# 블록(BLOCK 행) 단위 누적합과 최소/최대 희소 테이블만 들고 있고,
+# 양 끝의 걸친 블록은 read(i, j) 로 그 행만 다시 읽음 (최대 2*BLOCK 행)
+class RangeStats:
+    def __init__(self, values, read=None):
+        values = np.asarray(values, dtype=np.float64)
+        self.read = read or (lambda i, j: values[i:j])
+        sums, counts, lo, hi = _blocks(values)
+        self.sums = np.concatenate([[0.0], np.cumsum(sums)])
+        self.counts = np.concatenate([[0], np.cumsum(counts)])
+        self.min_table = _sparse_table(lo, np.minimum)
+        self.max_table = _sparse_table(hi, np.maximum)
+
+    # 행 범위 [i, j) 의 (평균, 최소, 최대, 개수). 값이 없으면 NaN
+    def query(self, i, j):
+        i, j = int(i), int(j)
+        if j <= i:
+            return np.nan, np.nan, np.nan, 0
+        first = -(-i // BLOCK)
+        last = j // BLOCK
+        if first >= last:
+            return summarize(self.read(i, j))
+        total = self.sums[last] - self.sums[first]
+        count = int(self.counts[last] - self.counts[first])
+        k = (last - first).bit_length() - 1
+        mn = min(self.min_table[k][first], self.min_table[k][last - (1 << k)])
+        mx = max(self.max_table[k][first], self.max_table[k][last - (1 << k)])
+        for a, b in ((i, first * BLOCK), (last * BLOCK, j)):
+            if a < b:
+                edge = np.asarray(self.read(a, b), dtype=np.float64)
+                valid = edge[~np.isnan(edge)]
+                if len(valid):
+                    total += valid.sum()
+                    count += len(valid)
+                    mn = min(mn, valid.min())
+                    mx = max(mx, valid.max())
+        if count == 0:
+            return np.nan, np.nan, np.nan, 0
+        return float(total / count), float(mn), float(mx), count
+
+
+# 일/주/월 단위 요약 (Time, mean, min, max, count)
+def rollup(times, values, freq):
+    series = pd.Series(np.asarray(values, dtype=np.float64), index=pd.DatetimeIndex(times))
+    frame = series.resample(freq, label="left", closed="left").agg(["mean", "min", "max", "count"])
+    return frame.rename_axis('Time').reset_index()
+
+
+# 요약 중 [start, end] 에 걸친 구간 (start 가 들어 있는 구간(일/주/월)부터 포함)
+def rollup_range(frame, start=None, end=None):
+    times = frame['Time'].to_numpy()
+    i = 0 if start is None else max(0, np.searchsorted(times, np.datetime64(pd.Timestamp(start)), side="right") - 1)
+    j = len(times) if end is None else np.searchsorted(times, np.datetime64(pd.Timestamp(end)), side="right")
+    return frame.iloc[i:j]
+
+
+# 이미 읽은 자료 조각의 통계 (기간 통계 테이블이 없는 경우)
+def summarize(values):
+    values = np.asarray(values, dtype=np.float64)
+    count = int(np.count_nonzero(~np.isnan(values)))
+    if count == 0:
+        return np.nan, np.nan, np.nan, 0
+    return float(np.nanmean(values)), float(np.nanmin(values)), float(np.nanmax(values)), count
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+from compact import CompactFrame
+from instrument import stage
+from resample import Grid
+from stats_cache import RangeStats, rollup, rollup_range
+
+
+# Time 기준으로 정렬된 관측 자료의 기간/시간대 조회
+# 자료는 compact.CompactFrame (int16 cm / float64 수위, int32 시간 수)으로 들고 있고,
+# 기간은 searchsorted 로 O(log n) 에 위치를 찾은 뒤 조회한 행만 풀어서 반환
+class TimeIndex:
+    def __init__(self, data):
+        with stage("index", rows=len(data)):
+            self._build(data)
+
+    def _build(self, data):
+        if isinstance(data, pd.DataFrame):
+            times = data['Time'].to_numpy()
+            if len(times) > 1 and (np.diff(times) < np.timedelta64(0)).any():
+                raise ValueError("TimeIndex 에는 Time 기준으로 정렬된 자료가 필요합니다.")
+            data = CompactFrame.from_frame(data)
+        self.data = data
+        # 시간대(0~23시)별 행 위치 (각각 오름차순)
+        hours = data.hour_of_day()
+        order = np.argsort(hours, kind="stable").astype(np.int32)
+        bounds = np.searchsorted(hours[order], np.arange(25))
+        self.hour_rows = [order[bounds[h]:bounds[h + 1]] for h in range(24)]
+        # 관측정별 기간 통계, 일/주/월 요약, 간격별 규칙 격자 (처음 쓸 때 만듦)
+        self._stats = {}
+        self._rollups = {}
+        self._grids = {}
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def columns(self):
+        return self.data.columns
+
+    # [start, end] 에 해당하는 행 범위 (i, j)
+    def bounds(self, start=None, end=None):
+        i = 0 if start is None else self.data.search(start, side="left")
+        j = len(self.data) if end is None else self.data.search(end, side="right")
+        return int(i), int(max(i, j))
+
+    def _rows(self, start, end, hour):
+        i, j = self.bounds(start, end)
+        if hour is None:
+            return slice(i, j)
+        hour_rows = self.hour_rows[hour]
+        i, j = np.searchsorted(hour_rows, np.array([i, j], dtype=np.int32))
+        return hour_rows[i:j]
+
+    # 기간(및 선택한 시간대)의 자료를 DataFrame으로 반환
+    def select(self, start=None, end=None, columns=None, hour=None):
+        with stage("range_filter" if hour is None else "hour_filter") as s:
+            df = self.data.frame(self._rows(start, end, hour), columns)
+            s.add(rows=len(df))
+            return df
+
+    # 기간(및 시간대)의 (Time 배열, (행, 관측정) 2차원 배열)
+    # 여러 관측정을 한 번의 기간 조회와 한 번의 배열 연산으로 꺼냄
+    def block(self, columns, start=None, end=None, hour=None):
+        with stage("range_filter" if hour is None else "hour_filter") as s:
+            rows = self._rows(start, end, hour)
+            times = self.data.times(rows)
+            s.add(rows=len(times))
+            return times, np.column_stack([self.data.values(c, rows) for c in columns])
+
+    # 기간 통계는 블록 단위 요약만 들고 있고, 양 끝 블록은 필요한 행만 풀어서 읽음
+    def stats(self, column):
+        if column not in self._stats:
+            with stage("stats_build", rows=len(self.data)):
+                self._stats[column] = RangeStats(self.data.values(column),
+                                                 read=lambda i, j: self.data.values(column, slice(i, j)))
+        return self._stats[column]
+
+    # 기간의 (평균, 최소, 최대, 개수)
+    def range_stats(self, column, start=None, end=None):
+        return self.stats(column).query(*self.bounds(start, end))
+
+    # 일/주/월 요약 중 기간에 해당하는 부분
+    def rollup(self, column, freq, start=None, end=None):
+        key = (column, freq)
+        if key not in self._rollups:
+            self._rollups[key] = rollup(self.data.times(), self.data.values(column), freq)
+        return rollup_range(self._rollups[key], start, end)
+
+    # 관측정 하나를 freq 간격 격자로 맞춘 자료 (관측정/간격마다 한 번만 만듦)
+    def grid(self, freq, column):
+        key = (column, freq)
+        if key not in self._grids:
+            with stage("grid_build", rows=len(self.data)):
+                self._grids[key] = Grid(self.data.times(), self.data.values(column), freq)
+        return self._grids[key]
@@ -0,0 +1,45 @@
+import threading
+import time
+
+import anomaly
+import data_loader
+from resample import STEPS
+from sites import get_site, site_names
+
+# 서버를 시작할 때 사이트 자료 캐시를 미리 채워서 첫 방문자가 자료를 읽는 시간을 기다리지 않게 함
+# 첫 화면과 같은 순서로: 자료 읽기 -> 기간 색인 -> 이상 자료 점검 -> 격자, 그리고 plotly import
+# 아직 준비 중인 사이트를 방문자가 요청하면 data_loader 의 사이트별 잠금에서 기다렸다가 같은 결과를 씀
+
+
+def prewarm_site(name):
+    site = get_site(name)
+    csv_name = site["csv"]
+    wells, first, last = data_loader.describe(csv_name)
+    data_loader.load_csv(csv_name, wells[:1], start=first, end=last)
+    anomaly.update(csv_name)
+    for freq in STEPS:
+        data_loader.regular(csv_name, wells[0], freq)
+    for well in wells:
+        data_loader.range_stats(csv_name, well)
+
+
+# 사이트마다 걸린 시간(초). 실패한 사이트는 오류 문자열
+def prewarm(names=None):
+    timings = {}
+    for name in names or site_names():
+        t = time.perf_counter()
+        try:
+            prewarm_site(name)
+            timings[name] = time.perf_counter() - t
+        except Exception as e:
+            # 미리 읽기에 실패해도 서버는 그대로 띄우고, 첫 방문 때 다시 시도
+            timings[name] = repr(e)
+    # 첫 그래프를 그릴 때의 plotly import 시간도 미리 씀
+    import plotly.express
+    return timings
+
+
+def prewarm_in_background(names=None):
+    thread = threading.Thread(target=prewarm, args=(names,), name="gw-prewarm", daemon=True)
+    thread.start()
+    return thread